@@ -0,0 +1,5 @@
+"""Benchmarks for the serializer, run with ``python -m benchmarks``.
+
+`benchmarks.graphs` generates object graphs shaped like real documents and
+`benchmarks.runner` times serializing them, saving and comparing baselines.
+"""
@@ -0,0 +1,144 @@
+"""Synthetic object graphs, and the schemas serializing them.
+
+Every generator takes the number of primary objects and returns them as a
+list of dicts, with the schema class to serialize them with. `Linked` fields
+always have a value, so users without a best friend, and the last nodes of
+chains, link to themselves.
+
+The schema names are prefixed with ``Graph`` so they don't shadow schemas
+referenced by name elsewhere.
+"""
+from serializer import Embedded, Linked, Schema
+
+
+class GraphUserSchema(Schema):
+    class Meta:
+        primary_key = 'user_id'
+        type = 'users'
+
+        additional = ('name', 'email')
+
+    best_friend = Linked('self')
+
+
+class GraphOrganizationSchema(Schema):
+    class Meta:
+        primary_key = 'organization_id'
+        type = 'organizations'
+
+        additional = ('name',)
+
+    owners = Linked(GraphUserSchema, many=True)
+
+
+class GraphTicketSchema(Schema):
+    class Meta:
+        primary_key = 'ticket_id'
+        type = 'tickets'
+
+        additional = ('name', 'price')
+
+
+class GraphEventSchema(Schema):
+    class Meta:
+        primary_key = 'event_id'
+        type = 'events'
+
+        additional = ('name', 'description', 'capacity')
+
+    organization = Linked(GraphOrganizationSchema)
+    tickets = Embedded(GraphTicketSchema, many=True)
+
+
+class GraphNodeSchema(Schema):
+    class Meta:
+        primary_key = 'node_id'
+        type = 'nodes'
+
+        additional = ('name',)
+
+    next = Linked('self')
+
+
+def user(user_id):
+    user = {
+        'user_id': user_id,
+        'name': 'User %d' % user_id,
+        'email': 'user%d@example.com' % user_id,
+    }
+    user['best_friend'] = user
+    return user
+
+
+def event(event_id, organization, tickets=()):
+    return {
+        'event_id': event_id,
+        'name': 'Event %d' % event_id,
+        'description': 'Description of event %d' % event_id,
+        'capacity': 100 + event_id,
+        'organization': organization,
+        'tickets': list(tickets)
+    }
+
+
+def flat(count):
+    """Wide flat list: events that each have their own organization with a
+    single owner and no tickets.
+    """
+    return [event(i, {'organization_id': i, 'name': 'Organization %d' % i, 'owners': [user(i)]})
+            for i in range(count)], GraphEventSchema
+
+
+def chain(count, depth=20):
+    """Deep `Linked` chains: ``count`` chains of ``depth`` nodes, each node
+    linking to the next.
+    """
+    heads = []
+    for i in range(count):
+        node = {'node_id': (i + 1) * depth - 1, 'name': 'Node %d' % (depth - 1)}
+        node['next'] = node
+        for j in reversed(range(depth - 1)):
+            node = {'node_id': i * depth + j, 'name': 'Node %d' % j, 'next': node}
+        heads.append(node)
+    return heads, GraphNodeSchema
+
+
+def fan_in(count, shared=10):
+    """Heavy fan-in: events all linking to the same ``shared`` organizations,
+    which share their owners.
+    """
+    owners = [user(i) for i in range(shared)]
+    organizations = [{'organization_id': i, 'name': 'Organization %d' % i, 'owners': owners}
+                     for i in range(shared)]
+    return [event(i, organizations[i % shared]) for i in range(count)], GraphEventSchema
+
+
+def cycles(count):
+    """Cycles: users who are each other's best friends in pairs, one of each
+    pair being a primary resource and the other side-loaded.
+    """
+    users = []
+    for i in range(count):
+        first, second = user(2 * i), user(2 * i + 1)
+        first['best_friend'], second['best_friend'] = second, first
+        users.append(first)
+    return users, GraphUserSchema
+
+
+def embedded(count, tickets=10):
+    """`Embedded` collections: events with ``tickets`` tickets each, sharing
+    one organization.
+    """
+    organization = {'organization_id': 1, 'name': 'Organization', 'owners': [user(1)]}
+    return [event(i, organization, ({'ticket_id': i * tickets + j, 'name': 'Ticket %d' % j, 'price': j * 10.0}
+                                    for j in range(tickets)))
+            for i in range(count)], GraphEventSchema
+
+
+GRAPHS = [
+    ('flat', flat),
+    ('chain', chain),
+    ('fan_in', fan_in),
+    ('cycles', cycles),
+    ('embedded', embedded),
+]
@@ -0,0 +1,173 @@
+"""Times serializing the graphs of `benchmarks.graphs`.
+
+For every graph and method (``serialize`` or ``dump``, both with
+``many=True``) three numbers are reported:
+
+- ``objects_per_sec``: primary objects serialized per second, best of
+  ``repeat`` runs.
+- ``peak_kib``: how much the peak resident memory of a fresh process grows
+  while serializing, in KiB.
+- ``allocations_per_object``: the net number of objects tracked by the
+  cyclic garbage collector (dicts, lists, instances...) allocated per primary
+  object, counted with the collector disabled. Temporaries freed by reference
+  counting aren't counted, so this is mostly what the result, and anything
+  kept alive with it, is made of.
+
+Results can be saved as a baseline and later runs compared against it::
+
+    python -m benchmarks --save baseline.json
+    python -m benchmarks --compare baseline.json
+"""
+import argparse
+import gc
+import json
+import resource
+import sys
+import time
+from multiprocessing import Pipe, Process
+
+from benchmarks.graphs import GRAPHS
+
+METHODS = ('serialize', 'dump')
+
+
+def run(method, schema_class, objs):
+    """Serialize ``objs`` like a request would, with a fresh schema."""
+    return getattr(schema_class(), method)(objs, many=True)
+
+
+def time_run(method, generate, count, repeat=3):
+    objs, schema_class = generate(count)
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        run(method, schema_class, objs)
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return count / best if best else float('inf')
+
+
+def count_allocations(method, generate, count):
+    objs, schema_class = generate(count)
+    run(method, schema_class, objs)  # warms up the plans and schemas
+    enabled = gc.isenabled()
+    gc.collect()
+    gc.disable()
+    try:
+        before = gc.get_count()[0]
+        result = run(method, schema_class, objs)
+        allocations = gc.get_count()[0] - before
+    finally:
+        if enabled:
+            gc.enable()
+    del result
+    return allocations / float(count)
+
+
+def measure_peak(method, generate, count):
+    """The growth of the peak memory of a fresh process serializing the
+    graph, in KiB.
+    """
+    receiver, sender = Pipe(duplex=False)
+    process = Process(target=_measure_peak, args=(sender, method, generate, count))
+    process.start()
+    peak = receiver.recv()
+    process.join()
+    return peak
+
+
+def _measure_peak(sender, method, generate, count):
+    objs, schema_class = generate(count)
+    before = _max_rss()
+    run(method, schema_class, objs)
+    sender.send(_max_rss() - before)
+
+
+def _max_rss():
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, KiB elsewhere
+    return max_rss // 1024 if sys.platform == 'darwin' else max_rss
+
+
+def benchmark(count=1000, repeat=3, graphs=None, methods=METHODS):
+    """Run the benchmarks for the named ``graphs`` (all of them by default)
+    with ``count`` primary objects each, returning ``{graph: {method:
+    results}}``.
+    """
+    results = {}
+    for name, generate in GRAPHS:
+        if graphs and name not in graphs:
+            continue
+        for method in methods:
+            results.setdefault(name, {})[method] = {
+                'objects_per_sec': time_run(method, generate, count, repeat),
+                'peak_kib': measure_peak(method, generate, count),
+                'allocations_per_object': count_allocations(method, generate, count),
+            }
+    return results
+
+
+def compare(baseline, results, tolerance=0.1):
+    """The ``(graph, method, metric, baseline, result)`` of every metric in
+    ``results`` that is more than ``tolerance`` worse than in ``baseline``.
+    """
+    regressions = []
+    for name, methods in sorted(results.items()):
+        for method, metrics in sorted(methods.items()):
+            base = baseline.get(name, {}).get(method)
+            if base is None:
+                continue
+            for metric, value in sorted(metrics.items()):
+                before = base.get(metric)
+                if not before:
+                    continue
+                change = (value - before) / float(before)
+                if metric == 'objects_per_sec':
+                    change = -change
+                if change > tolerance:
+                    regressions.append((name, method, metric, before, value))
+    return regressions
+
+
+def report(results, baseline=None, out=sys.stdout):
+    for name, methods in sorted(results.items()):
+        for method, metrics in sorted(methods.items()):
+            base = (baseline or {}).get(name, {}).get(method, {})
+            columns = []
+            for metric, value in sorted(metrics.items()):
+                column = '%s=%.1f' % (metric, value)
+                if base.get(metric):
+                    column += ' (%+.1f%%)' % ((value - base[metric]) * 100.0 / base[metric])
+                columns.append(column)
+            out.write('%-10s %-10s %s\n' % (name, method, '  '.join(columns)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='Benchmark the serializer.')
+    parser.add_argument('graphs', nargs='*', help='graphs to run, all by default: %s' %
+                        ', '.join(name for name, _ in GRAPHS))
+    parser.add_argument('--count', type=int, default=1000, help='primary objects per graph')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per benchmark')
+    parser.add_argument('--save', metavar='PATH', help='save the results as a baseline')
+    parser.add_argument('--compare', metavar='PATH', help='compare the results to a saved baseline')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='relative change in a metric counted as a regression')
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as fp:
+            baseline = json.load(fp)
+
+    results = benchmark(args.count, args.repeat, args.graphs)
+    report(results, baseline)
+
+    if args.save:
+        with open(args.save, 'w') as fp:
+            json.dump(results, fp, indent=2, sort_keys=True)
+    if baseline is not None:
+        regressions = compare(baseline, results, args.tolerance)
+        for regression in regressions:
+            sys.stdout.write('regression: %s %s %s %.1f -> %.1f\n' % regression)
+        return 1 if regressions else 0
+    return 0
@@ -1 +1,2 @@
-from serializer.schema import (Embedded, Schema, Linked, fields)
+from serializer.cache import ResourceCache
+from serializer.schema import (Embedded, IdentityMap, Schema, Linked, fields)
@@ -0,0 +1,217 @@
+"""A compact binary encoding of compound documents, see `Schema.serialize_binary`.
+
+Every key, every type name and every string in the root links is written
+once, in a string table at the start of the document, and referred to by its
+index everywhere else. The primary resources and every ``linked`` bucket are
+laid out column by column: the rows in the list, the keys used by any of
+them, and for every key its value in every row (or a marker for rows
+without it), so a key costs a few bytes per bucket rather than per resource.
+
+Values are tagged like MessagePack: integers as zigzag varints, floats as
+doubles, strings and containers prefixed by their length. `loads` returns
+the same dicts and lists `Schema.serialize` does, with strings as unicode
+like `json.loads`.
+"""
+import struct
+
+MAGIC = b'HSD\x01'
+
+_NONE, _FALSE, _TRUE, _INT, _FLOAT, _STRING, _SYMBOL, _LIST, _MAP, _COLUMNS, _MISSING = range(11)
+
+_double = struct.Struct('>d')
+
+
+def dumps(document):
+    """Encode a compound document."""
+    encoder = _Encoder()
+    encoder.document(document)
+
+    out = bytearray(MAGIC)
+    _varint(out, len(encoder.strings))
+    for string in encoder.strings:
+        _varint(out, len(string))
+        out += string
+    out += encoder.out
+    return bytes(out)
+
+
+def loads(data):
+    """Decode a compound document encoded by `dumps`."""
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError('Not a binary compound document')
+    decoder = _Decoder(bytearray(data), len(MAGIC))
+    decoder.strings = [decoder.string() for _ in range(decoder.varint())]
+    return decoder.value()
+
+
+def _varint(out, n):
+    while n > 0x7f:
+        out.append((n & 0x7f) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+class _Encoder(object):
+    def __init__(self):
+        self.out = bytearray()
+        self.strings = []
+        # string -> its index in ``strings``
+        self.symbols = {}
+
+    def document(self, document):
+        out = self.out
+        out.append(_MAP)
+        _varint(out, len(document))
+        for key, value in document.items():
+            self.symbol(key)
+            if key == 'linked':
+                out.append(_MAP)
+                _varint(out, len(value))
+                for type_, resources in value.items():
+                    self.symbol(type_)
+                    self.columns(resources)
+            elif key == 'links':
+                self.value(value, True)
+            elif isinstance(value, list):
+                self.columns(value)
+            else:
+                self.value(value)
+
+    def symbol(self, string):
+        index = self.symbols.get(string)
+        if index is None:
+            index = self.symbols[string] = len(self.strings)
+            self.strings.append(string.encode('utf-8') if isinstance(string, unicode) else string)
+        _varint(self.out, index)
+
+    def columns(self, resources):
+        if not all(type(resource) is dict for resource in resources):
+            return self.value(resources)
+        keys = []
+        seen = set()
+        for resource in resources:
+            for key in resource:
+                if key not in seen:
+                    seen.add(key)
+                    keys.append(key)
+
+        out = self.out
+        out.append(_COLUMNS)
+        _varint(out, len(resources))
+        _varint(out, len(keys))
+        missing = object()
+        for key in keys:
+            self.symbol(key)
+            for resource in resources:
+                value = resource.get(key, missing)
+                if value is missing:
+                    out.append(_MISSING)
+                else:
+                    self.value(value)
+
+    def value(self, value, symbols=False):
+        # ``symbols``: write strings to the string table, for the type names
+        # in the root links
+        out = self.out
+        if value is None:
+            out.append(_NONE)
+        elif value is True:
+            out.append(_TRUE)
+        elif value is False:
+            out.append(_FALSE)
+        elif isinstance(value, (int, long)):
+            out.append(_INT)
+            _varint(out, value << 1 if value >= 0 else ((-value) << 1) - 1)
+        elif isinstance(value, float):
+            out.append(_FLOAT)
+            out += _double.pack(value)
+        elif isinstance(value, basestring):
+            if symbols:
+                out.append(_SYMBOL)
+                self.symbol(value)
+            else:
+                out.append(_STRING)
+                encoded = value.encode('utf-8') if isinstance(value, unicode) else value
+                _varint(out, len(encoded))
+                out += encoded
+        elif isinstance(value, dict):
+            out.append(_MAP)
+            _varint(out, len(value))
+            for key, item in value.items():
+                self.symbol(key)
+                self.value(item, symbols)
+        elif isinstance(value, (list, tuple)):
+            out.append(_LIST)
+            _varint(out, len(value))
+            for item in value:
+                self.value(item, symbols)
+        else:
+            raise TypeError('%r can not be encoded' % (value,))
+
+
+class _Decoder(object):
+    def __init__(self, data, position):
+        self.data = data
+        self.position = position
+        self.strings = []
+
+    def varint(self):
+        data = self.data
+        position = self.position
+        n = shift = 0
+        while True:
+            byte = data[position]
+            position += 1
+            n |= (byte & 0x7f) << shift
+            if byte < 0x80:
+                break
+            shift += 7
+        self.position = position
+        return n
+
+    def string(self):
+        length = self.varint()
+        start = self.position
+        self.position += length
+        return bytes(self.data[start:self.position]).decode('utf-8')
+
+    def value(self):
+        tag = self.data[self.position]
+        self.position += 1
+        if tag == _NONE:
+            return None
+        if tag == _TRUE:
+            return True
+        if tag == _FALSE:
+            return False
+        if tag == _INT:
+            n = self.varint()
+            return -((n + 1) >> 1) if n & 1 else n >> 1
+        if tag == _FLOAT:
+            start = self.position
+            self.position += _double.size
+            return _double.unpack_from(bytes(self.data[start:self.position]))[0]
+        if tag == _STRING:
+            return self.string()
+        if tag == _SYMBOL:
+            return self.strings[self.varint()]
+        if tag == _LIST:
+            return [self.value() for _ in range(self.varint())]
+        if tag == _MAP:
+            strings = self.strings
+            result = {}
+            for _ in range(self.varint()):
+                key = strings[self.varint()]
+                result[key] = self.value()
+            return result
+        if tag == _COLUMNS:
+            rows = [{} for _ in range(self.varint())]
+            for _ in range(self.varint()):
+                key = self.strings[self.varint()]
+                for row in rows:
+                    if self.data[self.position] == _MISSING:
+                        self.position += 1
+                    else:
+                        row[key] = self.value()
+            return rows
+        raise ValueError('Unknown tag %d at %d' % (tag, self.position - 1))
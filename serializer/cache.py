@@ -0,0 +1,88 @@
+"""A cache of serialized resources shared across serializations.
+
+A schema opts in by naming a cache in its ``Meta``::
+
+    organizations = ResourceCache(max_size=200, ttl=60)
+
+    class OrganizationSchema(Schema):
+        class Meta:
+            primary_key = 'organization_id'
+            type = 'organizations'
+            cache = organizations
+            cache_version = 'updated_at'
+
+Resources are cached by schema class and field set, type, primary key and, if
+``cache_version`` is set, the value of that attribute, so bumping it (a
+version counter, ``updated_at`` or an etag) is enough to stop serving a stale
+resource. Otherwise resources have to be invalidated explicitly.
+"""
+import time
+from collections import OrderedDict
+
+
+class ResourceCache(object):
+    """Serialized resources, and their ``links``, by ``(serialization plan,
+    type, primary key, version)``; the plan stands for the schema class and
+    its field set.
+
+    Holds at most ``max_size`` resources, evicting the least recently used
+    one first, and if ``ttl`` is set, serves a resource for at most ``ttl``
+    seconds after it was serialized. ``hits`` and ``misses`` count lookups.
+    """
+    def __init__(self, max_size=1000, ttl=None, timer=time.time):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.timer = timer
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        # (type, primary key) -> the keys of the entries for that resource
+        self._resources = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """The cached value for ``key``, or `None`."""
+        entry = self._entries.pop(key, None)
+        if entry is not None and (entry[1] is None or entry[1] > self.timer()):
+            self._entries[key] = entry
+            self.hits += 1
+            return entry[0]
+        if entry is not None:
+            self._forget(key)
+        self.misses += 1
+        return None
+
+    def set(self, key, value):
+        if key in self._entries:
+            del self._entries[key]
+        else:
+            self._resources.setdefault(key[1:3], set()).add(key)
+        self._entries[key] = (value, None if self.ttl is None else self.timer() + self.ttl)
+        while len(self._entries) > self.max_size:
+            self._forget(self._entries.popitem(last=False)[0])
+
+    def invalidate(self, type_, id=None):
+        """Drop the cached resources of type ``type_`` with primary key
+        ``id``, or all of them if ``id`` is `None`, from every schema and
+        version.
+        """
+        if id is None:
+            resources = [resource for resource in self._resources if resource[0] == type_]
+        else:
+            resources = [(type_, id)]
+        for resource in resources:
+            for key in self._resources.pop(resource, ()):
+                del self._entries[key]
+
+    def clear(self):
+        self._entries.clear()
+        self._resources.clear()
+
+    def _forget(self, key):
+        # drops the index entry of a key already removed from the entries
+        keys = self._resources[key[1:3]]
+        keys.discard(key)
+        if not keys:
+            del self._resources[key[1:3]]
@@ -0,0 +1,39 @@
+"""Canonical, byte-for-byte reproducible compound documents, see
+`Schema.serialize_canonical`.
+
+Side-loaded resources are added to a document in traversal order and dicts
+are encoded in whatever order their keys happen to be in, so serializing the
+same objects twice can give different bytes. In a canonical document every
+``linked`` list is sorted by id and every object is encoded with sorted keys.
+Primary resources keep their order, which is the caller's.
+"""
+import hashlib
+import json
+
+
+def canonical_document(document):
+    """A copy of ``document`` with its ``linked`` lists sorted by id."""
+    document = dict(document)
+    if 'linked' in document:
+        document['linked'] = dict((type_, sorted(resources, key=_resource_id))
+                                  for type_, resources in document['linked'].items())
+    return document
+
+
+def dumps(value):
+    """The canonical JSON encoding of ``value``."""
+    return json.dumps(value, sort_keys=True, separators=(',', ':'))
+
+
+def fingerprint(resource):
+    """A digest of the serialized ``resource`` that changes with its contents."""
+    return hashlib.sha1(dumps(resource)).hexdigest()
+
+
+def etag(body):
+    """A strong HTTP ETag for the canonical JSON ``body``."""
+    return '"%s"' % hashlib.sha1(body).hexdigest()
+
+
+def _resource_id(resource):
+    return resource.get('id')
@@ -0,0 +1,219 @@
+"""Generates a specialized dump function per Schema class, see `Schema.compile`.
+
+The generated function does what `marshmallow.Schema.dump` followed by
+`Schema._postprocess` does for one resource, with every field read through a
+precompiled getter, every nested resource dumped by its own schema's
+generated function and linked resources deferred to the compound document
+directly, without going through `fields.Marshaller` or `Nested` fields.
+"""
+from marshmallow import fields, utils
+from marshmallow.exceptions import MarshallingError
+
+from serializer.schema import (Link, Nested, Resource, _FORMATTED_TYPES, _compile_getter,
+                               find_many_to_one)
+
+
+def compile_dump(schema):
+    """Return the generated dump function for ``schema``'s class, or `None` if
+    it, or any schema it nests, uses a feature the generated code doesn't
+    support.
+    """
+    if not _compilable(schema, set()):
+        return None
+
+    plan = schema.plan
+    namespace = {
+        'Link': Link,
+        'Resource': Resource,
+        'formatted_types': _FORMATTED_TYPES,
+        'text_type': utils.ensure_text_type,
+        'format_value': _format_value,
+        'serialize_field': _serialize_field,
+        'nested_schemas': _nested_schemas,
+        'get_key': plan.get_key,
+    }
+    nested = dict((field.name, field) for field in plan.nested)
+    lines = [
+        'def dump(schema, obj, document):',
+        '    data = {}',
+        '    fieldset = document.fieldsets.get(%r)' % plan.type,
+    ]
+
+    for i, (name, field) in enumerate(schema.fields.items()):
+        if name in nested:
+            continue
+        namespace['get_%d' % i] = _compile_getter(field.attribute or name, fan_out=True)
+        lines.append('    if fieldset is None or %r in fieldset:' % name)
+        if name in schema.declared_fields:
+            namespace['field_%d' % i] = field
+            lines.append('        data[%r] = serialize_field(schema, %r, field_%d, obj)' % (name, name, i))
+        else:
+            # `additional` fields are formatted by the type of their value
+            lines.extend([
+                '        value = get_%d(obj)' % i,
+                '        if type(value) in formatted_types:',
+                '            value = text_type(value) if type(value) is str else format_value(schema, value)',
+                '        data[%r] = value' % name,
+            ])
+
+    if plan.nested:
+        lines.extend([
+            '    nested = schema.__dict__.get("_nested_schemas") or nested_schemas(schema)',
+            '    visit = document.identity_map.visit',
+            '    include = document.include',
+        ])
+    if plan.linked:
+        lines.extend([
+            '    links = {}',
+            '    defer = document.defer',
+        ])
+
+    for i, field in enumerate(plan.nested):
+        nested_schema = schema.fields[field.name].schema
+        nested_schema.plan.compile(nested_schema)
+        namespace['get_nested_%d' % i] = field.get
+        namespace['loader_%d' % i] = field.loader
+        namespace['plan_%d' % i] = nested_schema.plan
+        namespace['get_key_%d' % i] = nested_schema.plan.get_key
+        lines.extend(_nested_lines(i, field, nested_schema.opts.cache is not None))
+    if plan.nested:
+        lines.append('    document.include = include')
+
+    if plan.linked:
+        lines.append('    data["links"] = links')
+    if not plan.anonymous:
+        lines.append('    data["id"] = get_key(obj)')
+    lines.append('    return Resource(data)')
+
+    exec compile('\n'.join(lines), '<dump %s>' % schema.__class__.__name__, 'exec') in namespace
+    return namespace['dump']
+
+
+def _nested_lines(i, field, cached):
+    # the include paths below this field, and the ids of linked resources
+    # that aren't included
+    if field.linked:
+        lines = [
+            '    nested_include = None if include is None else include.get(%r)' % field.name,
+            '    if include is not None and nested_include is None:',
+        ]
+        if field.many:
+            lines.extend([
+                '        children = get_nested_%d(obj)' % i,
+                '        if document.resolved:',
+                '            children = document.resolve_many(children)',
+                '        links[%r] = %s' % (field.name, 'list(children or ())' if field.loader is not None else
+                                           '[get_key_%d(child) for child in children or ()]' % i),
+            ])
+        else:
+            lines.extend([
+                '        child = get_nested_%d(obj)' % i,
+                '        if document.resolved:',
+                '            child = document.resolve(child)',
+                '        links[%r] = %s' % (field.name, 'child' if field.loader is not None else
+                                           'get_key_%d(child)' % i),
+            ])
+        nested_lines = _dump_nested_lines(i, field, cached)
+        return lines + ['    else:', '        document.include = nested_include'] + \
+            ['    ' + line for line in nested_lines]
+    return ['    document.include = None if include is None else include.get(%r, {})' % field.name] + \
+        _dump_nested_lines(i, field, cached)
+
+
+def _dump_nested_lines(i, field, cached):
+    # dumps the resource(s) of one nested field, mirroring
+    # `Schema._add_links` and `_unwrap_nested`; linked resources are deferred
+    # like `Linked` fields do, see `CompoundDocument.dump_deferred`
+    type_ = field.type
+    if field.linked:
+        dump_child = [
+            '        key = get_key_%d(child)' % i,
+            '        defer(field_%d, child)' % i,
+            '        %s(key)' % ('ids.append' if field.many else 'links[%r] = ' % field.name),
+        ]
+    else:
+        dump_child = [
+            '        key = get_key_%d(child)' % i,
+            '        if not visit(%r, key):' % type_,
+            '            result = Link(key)',
+            '        else:',
+            '            result = plan_%d.dump(nested[%d], child, document)' % (i, i) if not cached else
+            '            result = nested[%d]._dump_cached(child, key, document).data' % i,
+            '        %s(result.data)' % ('items.append' if field.many else 'data[%r] = ' % field.name),
+        ]
+
+    lines = ['    field_%d = schema.fields[%r]' % (i, field.name)] if field.linked else []
+    if field.many:
+        lines += [
+            '    %s = []' % ('ids' if field.linked else 'items'),
+            '    children = get_nested_%d(obj)' % i,
+            '    if document.resolved:',
+            '        children = document.resolve_many(children)',
+        ]
+        if field.loader is not None:
+            lines.append('    children = document.load(loader_%d, children or ())' % i)
+        lines.append('    for child in children:')
+        lines.extend(dump_child)
+        if field.linked:
+            lines.append('    links[%r] = ids' % field.name)
+        else:
+            lines.append('    data[%r] = items' % field.name)
+    else:
+        lines += [
+            '    child = get_nested_%d(obj)' % i,
+            '    if document.resolved:',
+            '        child = document.resolve(child)',
+        ]
+        if field.loader is not None:
+            lines.append('    child = document.load(loader_%d, [child])[0]' % i)
+        lines.extend(line[4:] for line in dump_child)
+    return lines
+
+
+def _compilable(schema, seen):
+    if schema.__class__ in seen:
+        return True
+    seen.add(schema.__class__)
+    if getattr(schema.__accessor__, 'im_func', None) is not find_many_to_one:
+        return False
+    for field in schema.fields.values():
+        if isinstance(field, Nested):
+            if field.only is not None or field.exclude or field.allow_null:
+                return False
+            # `Schema._dump_resource` checks these on the schema it dumps,
+            # but nested schemas are dumped by the generated code
+            if field.schema.prefix or field.schema.skip_missing:
+                return False
+            if not _compilable(field.schema, seen):
+                return False
+    return True
+
+
+def _nested_schemas(schema):
+    nested = schema._nested_schemas = tuple(schema.fields[field.name].schema
+                                            for field in schema.plan.nested)
+    for nested_schema in nested:
+        # linked resources are dumped by `CompoundDocument.dump_deferred`
+        # through `Schema.dump`, which uses the generated functions too
+        nested_schema._compiled = True
+    return nested
+
+
+def _serialize_field(schema, name, field, obj):
+    # what `fields.Marshaller` does for a single field
+    return fields._call_and_store(
+        getter_func=lambda d: field.serialize(name, d, accessor=schema.__accessor__),
+        data=obj,
+        field_name=name,
+        field_obj=field,
+        errors_dict=schema._marshal.errors,
+        exception_class=MarshallingError,
+        strict=schema.strict
+    )
+
+
+def _format_value(schema, value):
+    field = schema.TYPE_MAPPING[type(value)]()
+    if isinstance(field, fields.DateTime):
+        field.dateformat = schema.opts.dateformat
+    return field.serialize('value', {'value': value})
@@ -0,0 +1,138 @@
+"""Step-by-step serialization for event loops, see `Schema.serialize_steps`.
+
+This package supports Python 2, so it can't define coroutines itself. Instead
+`SerializationSteps` is a generator protocol any event loop can drive: every
+step yields a list of pending values to resolve (empty when the step only
+gives the loop a chance to run), and expects their results to be sent back in
+the same order. With asyncio::
+
+    steps = schema.serialize_steps(events, many=True)
+    step = iter(steps)
+    try:
+        pending = next(step)
+        while True:
+            if pending:
+                pending = step.send(await asyncio.gather(*pending))
+            else:
+                await asyncio.sleep(0)
+                pending = step.send(None)
+    except StopIteration:
+        pass
+    document = steps.result
+"""
+from itertools import islice
+
+from serializer.schema import CompoundDocument, Link
+
+
+def is_awaitable(value):
+    """Default test for pending relationship values: futures and coroutines."""
+    return hasattr(value, '__await__') or hasattr(value, 'add_done_callback')
+
+
+class SerializationSteps(object):
+    """Serializes ``obj`` with ``schema`` like `Schema.serialize`, dumping
+    ``step_size`` primary objects per step.
+
+    Before each step the `Linked`/`Embedded` relationships reachable from its
+    objects are walked, and the values for which ``is_pending`` is true are
+    yielded together so they can be resolved concurrently; the relationships of
+    their results are walked in turn. Every object is walked once per
+    serialization, and the loop is given control every ``walk_size`` objects
+    walked. The finished document is in ``result`` once iteration stops.
+    """
+    def __init__(self, schema, obj, many=False, step_size=100, identity_map=None, is_pending=None,
+                 walk_size=1000):
+        self.schema = schema
+        self.obj = obj
+        self.many = many
+        self.step_size = step_size
+        self.walk_size = walk_size
+        self.identity_map = identity_map
+        self.is_pending = is_pending or is_awaitable
+        self.result = None
+        # (schema class, field name) -> the schema to walk the field's values
+        # with, so chains of 'self' relationships don't create a schema per object
+        self._schemas = {}
+
+    def __iter__(self):
+        schema = self.schema
+        type_ = schema.opts.type
+        objs = iter(self.obj if self.many else [self.obj])
+        results = []
+
+        document = schema._document = CompoundDocument(self.identity_map, profiler=schema.profiler)
+        # id() of the objects walked so far
+        seen = set()
+        try:
+            while True:
+                step = list(islice(objs, self.step_size))
+                if not step:
+                    break
+                if schema.plan.has_loaders(schema):
+                    document.load_relationships(schema, step)
+                stack = [(schema, obj, False) for obj in step]
+                yielded = False
+                while stack:
+                    pending = {}
+                    while True:
+                        self._find_pending(document, stack, seen, pending)
+                        if not stack:
+                            break
+                        yield []
+                        yielded = True
+                    if not pending:
+                        break
+                    entries = pending.values()
+                    values = yield [value for _, value, _ in entries]
+                    yielded = True
+                    for (_, value, _), result in zip(entries, values):
+                        document.resolved[id(value)] = (value, result)
+                    stack = list(entries)
+                if results and not yielded:
+                    yield []
+                for obj in step:
+                    results.append(schema.dump(obj, False).data)
+        finally:
+            schema._document = None
+            document.finish()
+
+        if self.many:
+            self.result = {
+                type_: [result.data for result in results],
+                'linked': document.linked_lists(),
+                'links': schema.plan.root_links(schema) if results else {}
+            }
+        else:
+            result = results[0]
+            if not isinstance(result, Link):
+                result = {type_: result.data, 'linked': document.linked_lists(),
+                          'links': schema.plan.root_links(schema)}
+            self.result = result
+
+    def _find_pending(self, document, stack, seen, pending):
+        # walks the relationships from the (schema, value, is collection)
+        # entries on ``stack``, adding an entry to ``pending`` for every
+        # pending value found. Stops after ``walk_size`` objects, leaving the
+        # rest on ``stack``
+        budget = self.walk_size
+        while stack and budget:
+            budget -= 1
+            schema, obj, collection = stack.pop()
+            obj = document.resolve(obj)
+            if self.is_pending(obj):
+                pending[id(obj)] = (schema, obj, collection)
+            elif collection:
+                stack.extend((schema, item, False) for item in obj or ())
+            elif obj is not None and id(obj) not in seen:
+                seen.add(id(obj))
+                for field in schema.plan.nested:
+                    value = field.get(obj)
+                    if field.loader is not None:
+                        value = document.load(field.loader, value or ()) if field.many else \
+                            document.load(field.loader, [value])[0]
+                    key = (schema.__class__, field.name)
+                    nested_schema = self._schemas.get(key)
+                    if nested_schema is None:
+                        nested_schema = self._schemas[key] = schema.fields[field.name].schema
+                    stack.append((nested_schema, value, field.many))
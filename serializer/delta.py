@@ -0,0 +1,87 @@
+"""Differences between compound documents, see `Schema.serialize_delta`.
+
+A diff has the shape of a compound document, holding only the primary and
+side-loaded resources that are new or changed and the ``links`` that are new
+or changed, plus the ids of the resources no longer in the document::
+
+    {
+        'events': [{'id': 2, 'name': 'Justin Bieber', ...}],
+        'linked': {'users': [{'id': 3}]},
+        'links': {},
+        'removed': {'events': [], 'linked': {'users': [1]}}
+    }
+
+Resources are compared by a fingerprint of their serialized form, so a client
+that has applied every diff so far only needs the `Fingerprints` of the last
+document to get the next diff.
+"""
+from serializer.canonical import fingerprint
+
+
+class Fingerprints(dict):
+    """The fingerprints of the resources of a compound document with primary
+    type ``type_``, shaped like the document: ``{type_: {id: fingerprint},
+    'linked': {type: {id: fingerprint}}, 'links': links}``.
+    """
+
+
+def document_fingerprints(type_, document):
+    """The `Fingerprints` of the serialized compound ``document``."""
+    primary = document[type_]
+    if isinstance(primary, dict):
+        primary = [primary]
+    return Fingerprints({
+        type_: _bucket_fingerprints(primary),
+        'linked': dict((linked_type, _bucket_fingerprints(resources))
+                       for linked_type, resources in document.get('linked', {}).items()),
+        'links': dict(document.get('links', {}))
+    })
+
+
+def diff_documents(type_, previous, document):
+    """The diff turning ``previous``, a compound document or its
+    `Fingerprints`, into ``document``. Without a ``previous`` document the
+    diff holds the whole document.
+    """
+    if previous is None:
+        previous = Fingerprints({type_: {}, 'linked': {}, 'links': {}})
+    elif not isinstance(previous, Fingerprints):
+        previous = document_fingerprints(type_, previous)
+
+    primary = document[type_]
+    if isinstance(primary, dict):
+        primary = [primary]
+    changed, removed = _diff_bucket(previous[type_], primary)
+    diff = {
+        type_: changed,
+        'linked': {},
+        'links': dict((link, type_dict) for link, type_dict in document.get('links', {}).items()
+                      if previous['links'].get(link) != type_dict),
+        'removed': {type_: removed, 'linked': {}}
+    }
+
+    linked = document.get('linked', {})
+    for linked_type in set(linked) | set(previous['linked']):
+        changed, removed = _diff_bucket(previous['linked'].get(linked_type, {}), linked.get(linked_type, ()))
+        if changed:
+            diff['linked'][linked_type] = changed
+        if removed:
+            diff['removed']['linked'][linked_type] = removed
+    return diff
+
+
+def _bucket_fingerprints(resources):
+    return dict((resource.get('id'), fingerprint(resource)) for resource in resources)
+
+
+def _diff_bucket(fingerprints, resources):
+    # the new or changed resources, and the ids of the removed ones; resources
+    # without an id are always new
+    changed = []
+    ids = set()
+    for resource in resources:
+        id_ = resource.get('id')
+        ids.add(id_)
+        if id_ is None or fingerprints.get(id_) != fingerprint(resource):
+            changed.append(resource)
+    return changed, sorted(id_ for id_ in fingerprints if id_ not in ids)
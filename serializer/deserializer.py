@@ -0,0 +1,135 @@
+"""Turns compound documents back into object graphs, see `Schema.deserialize`.
+
+Every ``linked`` bucket (and the primary resources) is indexed by id once,
+and resources are then built in a single pass over a work queue rather than
+by recursion, so documents with long chains of relationships don't hit the
+recursion limit. Every resource is built at most once, and relationships to
+it, cycles included, refer to the same object.
+
+Resources are built as dicts, or as instances of the schema's
+``Meta.object_class`` (created without calling ``__init__``), keyed by the
+attributes the schema reads them from: ``Meta.primary_key`` for the id and the
+``attribute`` of every field. `Linked` relationships referring to a resource
+that isn't in the document are built with just their primary key, and those
+with a ``loader`` are left as keys.
+"""
+from collections import deque
+
+from serializer.schema import Nested
+
+
+def deserialize(schema, document):
+    """Build the primary resource (or the list of primary resources) of
+    ``document`` with ``schema``.
+    """
+    type_ = schema.opts.type
+    primary = document[type_]
+    many = isinstance(primary, list)
+    if not many:
+        primary = [primary]
+
+    index = dict((linked_type, dict((resource['id'], resource) for resource in resources))
+                 for linked_type, resources in document.get('linked', {}).items())
+    bucket = index.setdefault(type_, {})
+    for resource in primary:
+        if 'id' in resource:
+            bucket.setdefault(resource['id'], resource)
+
+    builder = _Builder(index)
+    results = [builder.resolve(schema, resource['id']) if 'id' in resource else builder.build(schema, resource)
+               for resource in primary]
+    builder.run()
+    return results if many else results[0]
+
+
+class _Builder(object):
+    def __init__(self, index):
+        self.index = index
+        # (type, id) -> the object built for the resource
+        self.objects = {}
+        # (schema, data, object) of the objects still to fill in
+        self.queue = deque()
+        # (schema class, field name) -> the schema of a nested field; every
+        # nested schema instance has its own nested schemas, so a chain of
+        # 'self' relationships would otherwise create a schema per resource
+        self.schemas = {}
+
+    def build(self, schema, data):
+        # an empty object for ``data``, filled in by `run`
+        obj = _new(schema)
+        self.queue.append((schema, data, obj))
+        return obj
+
+    def resolve(self, schema, id):
+        type_ = schema.opts.type
+        obj = self.objects.get((type_, id))
+        if obj is None:
+            data = self.index.get(type_, {}).get(id)
+            if data is None:
+                obj = _new(schema)
+                _setter(obj)(obj, schema.opts.primary_key, id)
+            else:
+                obj = self.build(schema, data)
+            self.objects[(type_, id)] = obj
+        return obj
+
+    def nested_schema(self, schema, name):
+        key = (schema.__class__, name)
+        nested_schema = self.schemas.get(key)
+        if nested_schema is None:
+            nested_schema = self.schemas[key] = schema.fields[name].schema
+        return nested_schema
+
+    def run(self):
+        queue = self.queue
+        while queue:
+            schema, data, obj = queue.popleft()
+            self.fill(schema, data, obj)
+
+    def fill(self, schema, data, obj):
+        set_ = _setter(obj)
+        fields_ = schema.fields
+        if not schema.opts.anonymous and 'id' in data:
+            set_(obj, schema.opts.primary_key, data['id'])
+
+        for name, value in data.items():
+            if name == 'id' or name == 'links':
+                continue
+            field = fields_.get(name)
+            if field is None:
+                set_(obj, name, value)
+            elif isinstance(field, Nested):
+                nested_schema = self.nested_schema(schema, name)
+                if value is None:
+                    nested = None
+                elif field.many:
+                    nested = [self.build(nested_schema, item) for item in value]
+                else:
+                    nested = self.build(nested_schema, value)
+                set_(obj, field.attribute or name, nested)
+            else:
+                set_(obj, field.attribute or name, value if value is None else field.deserialize(value))
+
+        links = data.get('links', {})
+        for field_plan in schema.plan.linked:
+            if field_plan.name not in links:
+                continue
+            field = fields_[field_plan.name]
+            ids = links[field_plan.name]
+            if field.loader is not None or ids is None:
+                value = ids
+            elif field.many:
+                nested_schema = self.nested_schema(schema, field_plan.name)
+                value = [self.resolve(nested_schema, id) for id in ids]
+            else:
+                value = self.resolve(self.nested_schema(schema, field_plan.name), ids)
+            set_(obj, field.attribute or field_plan.name, value)
+
+
+def _new(schema):
+    object_class = schema.opts.object_class
+    return {} if object_class is None else object_class.__new__(object_class)
+
+
+def _setter(obj):
+    return dict.__setitem__ if isinstance(obj, dict) else setattr
@@ -0,0 +1,190 @@
+"""Compound documents serialized on demand, see `Schema.serialize_lazy`."""
+from collections import Mapping, Sequence
+
+from serializer.schema import CompoundDocument
+
+
+class LazyDocument(Mapping):
+    """A compound document that serializes its parts as they are read.
+
+    Reads like the dict `Schema.serialize` returns. Every primary resource is
+    serialized when it is first read, and every ``linked`` bucket when it is
+    first read; the objects reachable from the primary ones are walked once,
+    without serializing anything, to find the resources of every type.
+    Serialized parts are kept. `materialize` returns the whole document as
+    plain dicts and lists.
+    """
+    def __init__(self, schema, obj, many=False, include=None, fieldsets=None):
+        self._schema = schema
+        self._type = schema.opts.type
+        self._many = many
+        self._objs = list(obj) if many else [obj]
+        self._fieldsets = fieldsets
+        self._document = CompoundDocument(include=include, fieldsets=fieldsets)
+        self._primary = LazyList(self._dump_primary, len(self._objs))
+        self._linked = LazyLinked(self._dump_linked, self._walk)
+        self._links = None
+
+    def __getitem__(self, key):
+        if key == self._type:
+            return self._primary if self._many else self._primary[0]
+        if key == 'linked':
+            return self._linked
+        if key == 'links':
+            if self._links is None:
+                self._links = self._schema.plan.root_links(self._schema) if self._objs else {}
+            return self._links
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter((self._type, 'linked', 'links'))
+
+    def __len__(self):
+        return 3
+
+    def materialize(self):
+        return {
+            self._type: list(self._primary) if self._many else self._primary[0],
+            'linked': dict(self._linked.items()),
+            'links': self['links']
+        }
+
+    def _dump_primary(self, index):
+        schema = self._schema
+        document = self._serialization_document()
+        schema._document = document
+        try:
+            return schema.dump(self._objs[index], False).data.data
+        finally:
+            schema._document = None
+
+    def _dump_linked(self, type_, entries):
+        # the side-loaded resources of a type from the (`Linked` field, object)
+        # entries found by `_walk`
+        document = self._serialization_document()
+        for field, obj in entries:
+            schema = field.schema
+            schema._document = document
+            try:
+                if not field._updated_fields:
+                    schema.many = False
+                    schema._update_fields(obj)
+                    field._updated_fields = True
+                field._serialize_one(schema, obj)
+            finally:
+                schema._document = None
+        return document.linked.get(type_, [])
+
+    def _serialization_document(self):
+        # relationships are only walked by `_walk`, so every resource is
+        # serialized with its relationships as ids
+        document = CompoundDocument(include=[], fieldsets=self._fieldsets)
+        document.loaded = self._document.loaded
+        return document
+
+    def _walk(self):
+        # type -> (`Linked` field, object) of every resource to side-load, in
+        # the order `Schema.serialize` would add them to the document. Walked
+        # depth first with an explicit stack, like `CompoundDocument.dump_deferred`
+        schema = self._schema
+        if schema.plan.has_loaders(schema):
+            self._document.load_relationships(schema, self._objs)
+        entries = {}
+        seen = set()
+        # (schema class, field name) -> the `Nested` field of the schema used
+        # for the class, so chains of 'self' relationships don't create a
+        # schema per object
+        fields_ = {}
+        include = self._document.include
+        # (iterator over the related objects, (type, `Linked` field, object)
+        # of the entry to add once they are done) of every object being walked
+        stack = [(iter([(schema, obj, include, None) for obj in self._objs]), None)]
+        while stack:
+            children, entry = stack[-1]
+            for schema, obj, include, via in children:
+                plan = schema.plan
+                key = (plan.type, plan.get_key(obj))
+                if key not in seen:
+                    seen.add(key)
+                    stack.append((self._related(schema, obj, include, fields_), (plan.type, via, obj)))
+                    break
+            else:
+                stack.pop()
+                if entry is not None and entry[1] is not None:
+                    type_, via, obj = entry
+                    entries.setdefault(type_, []).append((via, obj))
+        return entries
+
+    def _related(self, schema, obj, include, fields_):
+        # the (schema, object, include, `Linked` field or None) of the objects
+        # related to ``obj``
+        for field in schema.plan.nested:
+            nested_include = field.nested_include(include)
+            if include is not None and nested_include is None:
+                continue
+            nested_field = fields_.setdefault((schema.__class__, field.name), schema.fields[field.name])
+            nested_schema = nested_field.schema
+            value = field.get(obj)
+            if field.loader is not None:
+                value = self._document.load(field.loader, value or ()) if field.many else \
+                    self._document.load(field.loader, [value])[0]
+            for child in (value or ()) if field.many else [value]:
+                if child is not None:
+                    yield nested_schema, child, nested_include, nested_field if field.linked else None
+
+
+class LazyList(Sequence):
+    """A list of ``length`` items computed by ``get(index)`` when first read."""
+    def __init__(self, get, length):
+        self._get = get
+        self._items = [None] * length
+        self._loaded = [False] * length
+        self.loaded = 0
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if not self._loaded[index]:
+            self._items[index] = self._get(index % len(self))
+            self._loaded[index] = True
+            self.loaded += 1
+        return self._items[index]
+
+    def __len__(self):
+        return len(self._items)
+
+    def __eq__(self, other):
+        return isinstance(other, (list, LazyList)) and list(self) == list(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+
+class LazyLinked(Mapping):
+    """The ``linked`` buckets of a `LazyDocument`, each computed by
+    ``get(type, entries)`` from the entries ``walk`` finds for its type when
+    first read.
+    """
+    def __init__(self, get, walk):
+        self._get = get
+        self._walk = walk
+        self._entries = None
+        self._buckets = {}
+
+    def __getitem__(self, type_):
+        bucket = self._buckets.get(type_)
+        if bucket is None:
+            bucket = self._buckets[type_] = self._get(type_, self.entries[type_])
+        return bucket
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+    @property
+    def entries(self):
+        if self._entries is None:
+            self._entries = self._walk()
+        return self._entries
@@ -0,0 +1,72 @@
+"""Serializes large collections in chunks across a process pool, see
+`Schema.serialize_parallel`.
+"""
+from itertools import chain
+from multiprocessing import Pool
+
+from serializer.schema import _chunked
+
+
+def serialize_parallel(schema_class, objs, processes=None, chunk_size=1000):
+    """Serialize ``objs`` with ``schema_class`` in chunks of ``chunk_size``
+    objects on a pool of ``processes`` worker processes, and merge the chunks
+    into one compound document.
+    """
+    chunks = _chunked(objs, chunk_size)
+    first = next(chunks, [])
+    second = next(chunks, None)
+    if second is None:
+        # not worth starting any processes for
+        return _serialize_chunk((schema_class, first))
+
+    pool = Pool(processes)
+    try:
+        return merge_documents(schema_class.Meta.type,
+                               pool.imap(_serialize_chunk, ((schema_class, chunk)
+                                                            for chunk in chain([first, second], chunks))))
+    finally:
+        pool.close()
+        pool.join()
+
+
+def merge_documents(type_, documents):
+    """Merge compound documents serialized separately (e.g. in chunks) into
+    the one serializing all their primary resources at once would give.
+
+    Primary resources are concatenated. Side-loaded resources are kept in
+    document order, once per type and id, and dropped if they are one of the
+    primary resources. The ``links`` of the documents are combined, with
+    earlier documents taking precedence.
+    """
+    primary = []
+    linked = {}
+    links = {}
+    seen = {}
+    for document in documents:
+        primary.extend(document[type_])
+        for link, type_dict in document['links'].items():
+            links.setdefault(link, type_dict)
+        for linked_type, resources in document['linked'].items():
+            seen_ids = seen.setdefault(linked_type, set())
+            bucket = linked.setdefault(linked_type, [])
+            for resource in resources:
+                if resource['id'] not in seen_ids:
+                    seen_ids.add(resource['id'])
+                    bucket.append(resource)
+
+    primary_ids = set(resource.get('id') for resource in primary)
+    if type_ in linked:
+        linked[type_] = [resource for resource in linked[type_] if resource['id'] not in primary_ids]
+        if not linked[type_]:
+            del linked[type_]
+
+    return {
+        type_: primary,
+        'linked': linked,
+        'links': links
+    }
+
+
+def _serialize_chunk(args):
+    schema_class, chunk = args
+    return schema_class().serialize(chunk, many=True)
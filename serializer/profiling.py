@@ -0,0 +1,125 @@
+"""Timing of serializations per schema and relationship.
+
+Profiling is enabled by setting a `Profiler` as the ``profiler`` of a schema
+class or instance; the schemas it nests are profiled along with it::
+
+    EventSchema.profiler = Profiler(callback=export)
+
+While profiling, resources are dumped through marshmallow's marshaller even
+if the schema has been compiled (see `Schema.compile`), so that every field
+can be timed.
+"""
+from timeit import default_timer
+
+from serializer.schema import Link
+
+
+class Stats(object):
+    """What a `Profiler` measured for one ``kind`` of call, ``'dump'``,
+    ``'postprocess'`` or ``'field'``, of ``schema``'s ``field``.
+
+    ``time`` includes the calls nested in the call, ``self_time`` doesn't.
+    The resources of a `Linked` field are dumped once the resource linking to
+    them is done, so the ``'field'`` stats of `Linked` fields only time
+    recording them, and their dumps are in the ``'dump'`` stats of their
+    schema but not in the ``time`` of the resource linking to them.
+    For dumps, ``objects`` counts the resources serialized, ``links`` those
+    only referenced by id because they had been already, ``cache_hits`` those
+    served from the schema's cache and ``max_depth`` how deep in the graph of
+    resources the schema was dumped.
+    """
+    __slots__ = ('kind', 'schema', 'field', 'count', 'time', 'self_time', 'objects', 'links',
+                 'cache_hits', 'max_depth')
+
+    def __init__(self, kind, schema, field=None):
+        self.kind = kind
+        self.schema = schema
+        self.field = field
+        self.count = 0
+        self.time = 0.0
+        self.self_time = 0.0
+        self.objects = 0
+        self.links = 0
+        self.cache_hits = 0
+        self.max_depth = 0
+
+    def merge(self, stats):
+        self.count += stats.count
+        self.time += stats.time
+        self.self_time += stats.self_time
+        self.objects += stats.objects
+        self.links += stats.links
+        self.cache_hits += stats.cache_hits
+        self.max_depth = max(self.max_depth, stats.max_depth)
+
+    def as_dict(self):
+        return dict((name, getattr(self, name)) for name in self.__slots__)
+
+
+class Profiler(object):
+    """Collects `Stats` for every schema dumped, its ``_postprocess`` and its
+    `Nested` fields over any number of serializations.
+
+    ``callback`` is called with the `report` of every serialization when it
+    finishes, e.g. to export it to a metrics system.
+    """
+    def __init__(self, callback=None, timer=default_timer):
+        self.callback = callback
+        self.timer = timer
+        self.stats = {}
+        self._current = {}
+        # [start, time spent in nested calls] of every call being timed
+        self._stack = []
+        # how deep in the graph of resources the resource being dumped is
+        self.depth = 0
+
+    def report(self, stats=None):
+        """The `Stats` of all the serializations so far as dicts, the ones
+        with the most self time first.
+        """
+        stats = self.stats if stats is None else stats
+        return [entry.as_dict() for entry in sorted(stats.values(), key=lambda entry: -entry.self_time)]
+
+    def reset(self):
+        self.stats.clear()
+
+    def enter(self, dump=False):
+        self._stack.append([self.timer(), 0.0])
+        if dump:
+            self.depth += 1
+
+    def exit(self, kind, schema, field=None, result=None, cache_hit=False):
+        end = self.timer()
+        start, nested = self._stack.pop()
+        elapsed = end - start
+        if self._stack:
+            self._stack[-1][1] += elapsed
+
+        key = (kind, schema.__class__.__name__, field)
+        stats = self._current.get(key)
+        if stats is None:
+            stats = self._current[key] = Stats(*key)
+        stats.count += 1
+        stats.time += elapsed
+        stats.self_time += elapsed - nested
+        if kind == 'dump':
+            stats.max_depth = max(stats.max_depth, self.depth)
+            self.depth -= 1
+            if isinstance(result, Link):
+                stats.links += 1
+            else:
+                stats.objects += 1
+                stats.cache_hits += cache_hit
+
+    def finish(self):
+        """Called at the end of every serialization."""
+        current, self._current = self._current, {}
+        del self._stack[:]
+        self.depth = 0
+        for key, stats in current.items():
+            if key in self.stats:
+                self.stats[key].merge(stats)
+            else:
+                self.stats[key] = stats
+        if self.callback is not None:
+            self.callback(self.report(current))
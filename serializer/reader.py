@@ -0,0 +1,182 @@
+"""Random access to resources in large serialized compound documents.
+
+`DocumentReader` memory-maps a document written by `Schema.serialize_to` (or
+any JSON encoding of a compound document) and indexes the byte offsets of the
+primary resources and of every side-loaded resource by type and id, so single
+resources can be read, and their links followed, without parsing the whole
+document. Building the index scans the document once; it can be saved next
+to the document and is reused as long as the document doesn't change::
+
+    reader = EventSchema().read_document('events.json', index_path='events.json.index')
+    event = reader.get('events', 42)
+    organization = reader.resolve('events', event, 'organization')
+"""
+import json
+import mmap
+import os
+import re
+
+# strings, structural characters and the other scalars of a JSON document
+_TOKEN = re.compile(r'"(?:[^"\\]|\\.)*"|[{}\[\],:]|[^\s{}\[\],:"]+')
+
+# roles of the containers in a document
+_ROOT, _PRIMARY, _LINKED, _BUCKET, _RESOURCE, _OTHER = range(6)
+
+
+class DocumentIndex(object):
+    """The ``(start, end)`` offsets of the resources of a compound document
+    with primary type ``type``: ``primary`` lists the primary resources as
+    ``(id, start, end)`` in document order and ``linked`` maps every
+    side-loaded type to the same. ``size`` and ``mtime`` identify the version
+    of the document indexed.
+    """
+    def __init__(self, type_, primary, linked, many, size=None, mtime=None):
+        self.type = type_
+        self.primary = primary
+        self.linked = linked
+        self.many = many
+        self.size = size
+        self.mtime = mtime
+        self.resources = {}
+        for type_, entries in [(type_, primary)] + linked.items():
+            for id, start, end in entries:
+                self.resources.setdefault((type_, id), (start, end))
+
+    @classmethod
+    def build(cls, buf, type_):
+        """Index the document in ``buf``, a string or memory map."""
+        primary = []
+        linked = {}
+        many = False
+        # [role, type of the resources in it, current key, expecting a key,
+        #  start, id] of every open container
+        stack = []
+        for match in _TOKEN.finditer(buf):
+            token = match.group()
+            first = token[0]
+            if first == '{' or first == '[':
+                role, resource_type = _OTHER, None
+                if stack:
+                    parent_role, parent_type, key = stack[-1][0], stack[-1][1], stack[-1][2]
+                    if parent_role == _ROOT:
+                        if key == type_:
+                            many = first == '['
+                            role, resource_type = (_PRIMARY, type_) if many else (_RESOURCE, type_)
+                        elif key == 'linked':
+                            role = _LINKED
+                    elif parent_role == _PRIMARY and first == '{':
+                        role, resource_type = _RESOURCE, parent_type
+                    elif parent_role == _LINKED and first == '[':
+                        role, resource_type = _BUCKET, key
+                    elif parent_role == _BUCKET and first == '{':
+                        role, resource_type = _RESOURCE, parent_type
+                else:
+                    role = _ROOT
+                stack.append([role, resource_type, None, first == '{', match.start(), None])
+            elif first == '}' or first == ']':
+                role, resource_type, _, _, start, id = stack.pop()
+                if role == _RESOURCE:
+                    entry = (id, start, match.end())
+                    if stack and stack[-1][0] == _BUCKET:
+                        linked.setdefault(resource_type, []).append(entry)
+                    else:
+                        primary.append(entry)
+            elif first == ',':
+                frame = stack[-1]
+                frame[3] = buf[frame[4]] == '{'
+            elif first != ':':
+                frame = stack[-1]
+                if frame[3]:
+                    frame[2] = json.loads(token)
+                    frame[3] = False
+                elif frame[0] == _RESOURCE and frame[2] == 'id':
+                    frame[5] = json.loads(token)
+        return cls(type_, primary, linked, many)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as fp:
+            data = json.load(fp)
+        return cls(data['type'], [tuple(entry) for entry in data['primary']],
+                   dict((type_, [tuple(entry) for entry in entries]) for type_, entries in data['linked'].items()),
+                   data['many'], data['size'], data['mtime'])
+
+    def save(self, path):
+        with open(path, 'w') as fp:
+            json.dump({
+                'type': self.type,
+                'primary': self.primary,
+                'linked': self.linked,
+                'many': self.many,
+                'size': self.size,
+                'mtime': self.mtime
+            }, fp)
+
+
+class DocumentReader(object):
+    """Reads the resources of the compound document at ``path``, serialized
+    with ``schema``, without loading the whole document.
+
+    The index is read from ``index_path`` if it has one for the current
+    version of the document; otherwise it is built, and saved there.
+    """
+    def __init__(self, path, schema, index_path=None):
+        self.schema = schema
+        self._file = open(path, 'rb')
+        stat = os.fstat(self._file.fileno())
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.index = None
+        if index_path is not None and os.path.exists(index_path):
+            index = DocumentIndex.load(index_path)
+            if (index.size, index.mtime) == (stat.st_size, stat.st_mtime):
+                self.index = index
+        if self.index is None:
+            self.index = DocumentIndex.build(self._map, schema.opts.type)
+            self.index.size, self.index.mtime = stat.st_size, stat.st_mtime
+            if index_path is not None:
+                self.index.save(index_path)
+        self._links = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __len__(self):
+        return len(self.index.primary)
+
+    def __iter__(self):
+        """The primary resources, in document order."""
+        for _, start, end in self.index.primary:
+            yield self._read(start, end)
+
+    def get(self, type_, id, default=None):
+        """The resource of type ``type_`` with ``id``, primary or side-loaded."""
+        span = self.index.resources.get((type_, id))
+        return default if span is None else self._read(*span)
+
+    @property
+    def links(self):
+        """The root links of the document, from the schema's plan."""
+        if self._links is None:
+            self._links = self.schema.plan.root_links(self.schema)
+        return self._links
+
+    def resolve(self, type_, resource, name):
+        """The resource, or list of resources, that the relationship ``name``
+        of ``resource``, of type ``type_``, links to. Resources missing from
+        the document are `None`.
+        """
+        target = self.links['%s.%s' % (type_, name)]['type']
+        ids = resource.get('links', {}).get(name)
+        if isinstance(ids, list):
+            return [self.get(target, id) for id in ids]
+        return None if ids is None else self.get(target, ids)
+
+    def _read(self, start, end):
+        return json.loads(self._map[start:end])
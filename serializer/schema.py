@@ -1,194 +1,1161 @@
-from itertools import ifilter
+from itertools import imap, islice, izip
 
 from marshmallow import Schema as MSchema, SchemaOpts, fields, MarshalResult, utils
+from marshmallow.fields import null
 
 
-class Link:
+class Link(object):
+    """A reference to a resource by id, in place of the serialized resource."""
+    __slots__ = ('id',)
+
     def __init__(self, id):
         self.id = id
 
 
+class Resource(object):
+    """A serialized resource, as returned for a nested resource by `Schema.dump`."""
+    __slots__ = ('data',)
+
+    def __init__(self, data):
+        self.data = data
+
+
+class IdentityMap(object):
+    """The resources seen during a serialization, keyed by ``(type, primary key)``.
+
+    A resource that has already been seen is only referenced by id (see `Link`)
+    and side-loaded resources are stored exactly once. A fresh map is used for
+    every call to `Schema.serialize`/`Schema.dump` unless one is passed in, so
+    reusing a map on purpose treats everything it holds as already sent.
+    """
+    def __init__(self):
+        self._resources = {}
+
+    def __contains__(self, key):
+        return key in self._resources
+
+    def __len__(self):
+        return len(self._resources)
+
+    def visit(self, type_, id):
+        """Mark a resource as seen. Returns `False` if it already was."""
+        key = (type_, id)
+        if key in self._resources:
+            return False
+        self._resources[key] = None
+        return True
+
+    def add(self, type_, id, resource):
+        """Store a serialized resource. Returns `False` if one was already stored."""
+        key = (type_, id)
+        if self._resources.get(key) is not None:
+            return False
+        self._resources[key] = resource
+        return True
+
+    def get(self, type_, id, default=None):
+        resource = self._resources.get((type_, id))
+        return default if resource is None else resource
+
+    def clear(self):
+        self._resources.clear()
+
+
+class CompoundDocument(object):
+    """Accumulates the side-loaded resources of one serialization.
+
+    Every `Linked` resource is written here exactly once, bucketed by type, as
+    soon as it has been dumped, instead of being copied up through the
+    ``linked`` dict of every enclosing resource.
+    """
+    def __init__(self, identity_map=None, include=None, fieldsets=None, profiler=None):
+        self.identity_map = IdentityMap() if identity_map is None else identity_map
+        # a `serializer.profiling.Profiler`, see `Schema.profiler`
+        self.profiler = profiler
+        self.linked = {}
+        # the include paths below the resource being dumped as a tree of
+        # dicts, or None to include everything, see `Schema.serialize`
+        self.include = None if include is None else _include_tree(include)
+        self.fieldsets = dict((type_, frozenset(names)) for type_, names in (fieldsets or {}).items())
+        # batch loader -> {key: object}, see `Nested`
+        self.loaded = {}
+        # id(pending value) -> (pending value, result), see `Schema.serialize_steps`
+        self.resolved = {}
+        # the (schema, object, include) of the `Linked` resources to dump once
+        # the resource being dumped is done, see `dump_deferred`
+        self.deferred = None
+        # (schema class, field name) -> the schema deferred resources of the
+        # field are dumped with; every nested schema instance has its own
+        # nested schemas, so a chain of 'self' relationships would otherwise
+        # create a schema per resource
+        self.schemas = {}
+
+    def load(self, loader, keys):
+        """Return the objects for ``keys`` from the batch ``loader`` of a
+        relationship, calling it once for all the keys not loaded before.
+        """
+        cache = self.loaded.get(loader)
+        if cache is None:
+            cache = self.loaded[loader] = {}
+        missing = list(set(key for key in keys if key is not None and key not in cache))
+        if missing:
+            results = loader(missing)
+            if not isinstance(results, dict):
+                results = dict(zip(missing, results))
+            for key in missing:
+                cache[key] = results.get(key)
+        return [cache.get(key) for key in keys]
+
+    def load_relationships(self, schema, objs):
+        """Load the included relationships reachable from ``objs`` that have a
+        batch loader, one level of the object graph at a time, calling every
+        loader at most once per level.
+        """
+        seen = set()
+        level = [(schema, obj, self.include) for obj in objs]
+        while level:
+            requests = {}
+            next_level = []
+            for schema, obj, include in level:
+                if obj is None or id(obj) in seen:
+                    continue
+                seen.add(id(obj))
+                for field in schema.plan.nested:
+                    nested_include = field.nested_include(include)
+                    if nested_include is None and include is not None:
+                        continue
+                    nested_schema = schema.fields[field.name].schema
+                    value = field.get(obj)
+                    values = (value or ()) if field.many else [value]
+                    if field.loader is None:
+                        next_level.extend((nested_schema, item, nested_include) for item in values)
+                    else:
+                        requests.setdefault(field.loader, []).append((nested_schema, values, nested_include))
+            for loader, fields_ in requests.items():
+                self.load(loader, [key for _, keys, _ in fields_ for key in keys])
+                for nested_schema, keys, nested_include in fields_:
+                    next_level.extend((nested_schema, item, nested_include) for item in self.load(loader, keys))
+            level = next_level
+
+    def resolve(self, value):
+        entry = self.resolved.get(id(value))
+        return value if entry is None else entry[1]
+
+    def resolve_many(self, values):
+        return [self.resolve(value) for value in self.resolve(values)]
+
+    def defer(self, field, obj):
+        """Dump ``obj``, linked to by the `Linked` ``field``, once the
+        resource being dumped is done.
+        """
+        key = (field.parent.__class__, field.name)
+        schema = self.schemas.get(key)
+        if schema is None:
+            schema = self.schemas[key] = field.schema
+            field._prepare_schema(schema, [obj] if field.many else obj)
+        self.deferred.append((schema, obj, self.include))
+
+    def dump_deferred(self, children):
+        """Dump the `Linked` resources deferred while dumping a resource,
+        those deferred while dumping them, and so on, depth first with an
+        explicit stack rather than by recursion, so chains of relationships of
+        any length can be dumped. Resources are visited, and added to the
+        document once everything they link to has been, in the same order as
+        if every `Linked` field dumped its resources itself.
+        """
+        include = self.include
+        profiler = self.profiler
+        depth = 0 if profiler is None else profiler.depth
+        # (iterator over the deferred children, (type, resource) to add once
+        # they are done) of every resource being dumped
+        stack = [(iter(children), None)]
+        try:
+            while stack:
+                children, parent = stack[-1]
+                for schema, obj, child_include in children:
+                    self.include = child_include
+                    self.deferred = deferred = []
+                    if profiler is not None:
+                        profiler.depth = depth + len(stack)
+                    previous, schema._document = schema._document, self
+                    try:
+                        result = schema.dump(obj, False, update_fields=False).data
+                    finally:
+                        schema._document = previous
+                    if not isinstance(result, Link):
+                        stack.append((iter(deferred), (schema.plan.type, result.data)))
+                        break
+                else:
+                    stack.pop()
+                    if parent is not None:
+                        type_, resource = parent
+                        self.add(type_, resource['id'], resource)
+        finally:
+            self.include = include
+            if profiler is not None:
+                profiler.depth = depth
+
+    def add(self, type_, id, resource):
+        if self.identity_map.add(type_, id, resource):
+            bucket = self.linked.get(type_)
+            if bucket is None:
+                bucket = self.linked[type_] = []
+            bucket.append(resource)
+
+    def linked_lists(self):
+        return dict(self.linked)
+
+    def finish(self):
+        """Called once the serialization is done."""
+        if self.profiler is not None:
+            self.profiler.finish()
+
+
+class EncodedDocument(CompoundDocument):
+    """A `CompoundDocument` that encodes every side-loaded resource with
+    ``dumps`` as soon as it is added, keeping a buffer of JSON per type
+    instead of the resources themselves.
+    """
+    def __init__(self, dumps, identity_map=None, include=None, fieldsets=None, profiler=None):
+        super(EncodedDocument, self).__init__(identity_map, include, fieldsets, profiler)
+        self.dumps = dumps
+
+    def add(self, type_, id, resource):
+        if self.identity_map.get(type_, id) is None:
+            encoded = self.dumps(resource)
+            self.identity_map.add(type_, id, encoded)
+            bucket = self.linked.get(type_)
+            if bucket is None:
+                bucket = self.linked[type_] = []
+            bucket.append(encoded)
+
+    def linked_json(self):
+        """The JSON of the ``linked`` object of the document."""
+        return '{%s}' % ', '.join('%s: [%s]' % (self.dumps(type_), ', '.join(bucket))
+                                  for type_, bucket in self.linked.items())
+
+
+class ColumnarDocument(CompoundDocument):
+    """A `CompoundDocument` that appends every side-loaded resource to the
+    columns of its type as soon as it is added, see `Columns`.
+    """
+    def add(self, type_, id, resource):
+        if self.identity_map.get(type_, id) is None:
+            bucket = self.linked.get(type_)
+            if bucket is None:
+                bucket = self.linked[type_] = Columns()
+            self.identity_map.add(type_, id, bucket.length)
+            bucket.append(resource)
+
+    def linked_lists(self):
+        return dict((type_, bucket.columns) for type_, bucket in self.linked.items())
+
+
+class Columns(object):
+    """Resources stored column by column: ``columns`` maps every key to the
+    list of its values, one per resource, with the ids of every relationship
+    under ``'links.<name>'``. Resources without a key have `None` for it.
+    """
+    def __init__(self):
+        self.columns = {}
+        self.length = 0
+
+    def append(self, resource):
+        columns = self.columns
+        width = len(resource)
+        for key, value in resource.items():
+            if key == 'links':
+                width += len(value) - 1
+                for name, ids in value.items():
+                    self._append('links.' + name, ids)
+            else:
+                self._append(key, value)
+        self.length = length = self.length + 1
+        if width != len(columns):
+            for values in columns.values():
+                if len(values) < length:
+                    values.append(None)
+
+    def _append(self, key, value):
+        values = self.columns.get(key)
+        if values is None:
+            values = self.columns[key] = [None] * self.length
+        values.append(value)
+
+
 class Nested(fields.Nested):
-    def __init__(self, nested, default=None, **kwargs):
+    """A relationship to resources of another schema.
+
+    With a ``loader``, the attribute holds the key (or, with ``many``, the
+    keys) of the related objects instead, and ``loader`` is called with a list
+    of keys to fetch them, returning a dict from key to object or a list of
+    objects in the same order. Serialization collects the keys of a whole level
+    of the object graph and calls each loader once for all of them, caching
+    the objects for the rest of the serialization.
+    """
+    def __init__(self, nested, default=None, loader=None, **kwargs):
         super(Nested, self).__init__(nested, default=default, **kwargs)
+        self.loader = loader
+        self._updated_fields = False
+
+    def _serialize(self, nested_obj, attr, obj):
+        schema = self.schema
+        document = self.parent._document
+        # the nested schema only holds on to the document while it is used
+        previous, schema._document = schema._document, document
+        try:
+            profiler = document.profiler
+            if profiler is None:
+                return self._serialize_included(schema, document, nested_obj)
+            profiler.enter()
+            result = self._serialize_included(schema, document, nested_obj)
+            profiler.exit('field', self.parent, self.name)
+            return result
+        finally:
+            schema._document = previous
+
+    def _serialize_included(self, schema, document, nested_obj):
+        include = document.include
+        if include is None:
+            return self._serialize_nested(schema, document, nested_obj)
+
+        nested_include = self._nested_include(include)
+        if nested_include is None:
+            return self._serialize_links(schema, document, nested_obj)
+        document.include = nested_include
+        try:
+            return self._serialize_nested(schema, document, nested_obj)
+        finally:
+            document.include = include
+
+    def _nested_include(self, include):
+        return include.get(self.name, {})
+
+    def _serialize_links(self, schema, document, nested_obj):
+        # a relationship that isn't included is only referenced by id
+        if document.resolved:
+            nested_obj = document.resolve_many(nested_obj) if self.many else document.resolve(nested_obj)
+        if self.allow_null and nested_obj is None:
+            return None
+        get_key = (lambda key: key) if self.loader is not None else schema.plan.get_key
+        if self.many:
+            return [Link(get_key(o)) for o in nested_obj or ()]
+        return Link(get_key(nested_obj))
+
+    def _serialize_nested(self, schema, document, nested_obj):
+        if document.resolved:
+            nested_obj = document.resolve_many(nested_obj) if self.many else document.resolve(nested_obj)
+        if self.loader is not None:
+            nested_obj = document.load(self.loader, nested_obj or ()) if self.many else \
+                document.load(self.loader, [nested_obj])[0]
+        if self.allow_null and nested_obj is None:
+            return None
+        self._prepare_schema(schema, nested_obj)
+        if self.many:
+            return [self._serialize_one(schema, o) for o in nested_obj]
+        return self._serialize_one(schema, nested_obj)
+
+    def _prepare_schema(self, schema, nested_obj):
+        if not self._updated_fields:
+            schema._update_fields(nested_obj)
+            # items are dumped one by one from here on
+            schema.many = False
+            self._updated_fields = True
+
+    def _serialize_one(self, schema, obj):
+        return schema.dump(obj, False, update_fields=False).data
 
 
 class Linked(Nested):
-    pass
+    def _nested_include(self, include):
+        return include.get(self.name)
+
+    def _serialize_one(self, schema, obj):
+        document = schema._document
+        if document.deferred is not None:
+            document.defer(self, obj)
+            return Link(schema.plan.get_key(obj))
+        result = super(Linked, self)._serialize_one(schema, obj)
+        if not isinstance(result, Link):
+            type_ = schema.plan.type
+            document.add(type_, result.data['id'], result.data)
+        return result
 
 
 class Embedded(Nested):
     pass
 
 
+class FieldPlan(object):
+    def __init__(self, field, parent_type):
+        self.name = field.name
+        self.many = field.many
+        self.type = field.schema.opts.type
+        self.linked = isinstance(field, Linked)
+        self.embedded = isinstance(field, Embedded)
+        self.link_key = parent_type + "." + field.name
+        self.get = _compile_getter(field.attribute or field.name, fan_out=True)
+        self.loader = field.loader
+
+    def nested_include(self, include):
+        """The include paths below this field, see `CompoundDocument.include`."""
+        if include is None:
+            return None
+        return include.get(self.name) if self.linked else include.get(self.name, {})
+
+
+class SerializationPlan(object):
+    """Everything `Schema._postprocess` needs to know about a schema's fields,
+    compiled once per Schema class (and field set) instead of on every object.
+    """
+    def __init__(self, schema):
+        self.type = schema.opts.type
+        self.anonymous = schema.opts.anonymous
+        self.get_key = _compile_getter(schema.opts.primary_key)
+        self.get_version = _compile_getter(schema.opts.cache_version) if schema.opts.cache_version else None
+        self.nested = [FieldPlan(field, self.type)
+                       for field in schema.fields.values() if isinstance(field, Nested)]
+        self.linked = [field for field in self.nested if field.linked]
+        self.embedded = [field for field in self.nested if field.embedded]
+        self.compiled = False
+        self.dump = None
+        self.uses_loaders = None
+        self.replayed = None
+        self.links = None
+        self.inlined = None
+
+    def has_loaders(self, schema):
+        """Whether any relationship reachable from ``schema`` has a batch loader."""
+        if self.uses_loaders is None:
+            self.uses_loaders = _uses_loaders(schema, set())
+        return self.uses_loaders
+
+    def root_links(self, schema):
+        """The root ``links`` of a compound document with ``schema``'s
+        resources as primary resources, describing every relationship
+        reachable from it.
+        """
+        if self.links is None:
+            self.links = _root_links(schema)
+        return dict((link, dict(type_dict)) for link, type_dict in self.links.items())
+
+    def inlined_types(self, schema):
+        """The types of the resources serialized into a resource of
+        ``schema``: its own, and those of the schemas it embeds.
+        """
+        if self.inlined is None:
+            self.inlined = frozenset(_inlined_types(schema, set()))
+        return self.inlined
+
+    def replay_fields(self, schema):
+        """The relationships to walk for a cached resource of ``schema`` to
+        side-load what it links to: the linked ones, and the embedded ones
+        that reach a linked one.
+        """
+        if self.replayed is None:
+            self.replayed = [field for field in self.nested
+                             if field.linked or _reaches_linked(schema.fields[field.name].schema, set())]
+        return self.replayed
+
+    def compile(self, schema):
+        """Generate the dump function for this plan, see `Schema.compile`.
+        Returns `None` if the schema can't be compiled.
+        """
+        if not self.compiled:
+            from serializer.compiler import compile_dump
+            self.compiled = True
+            self.dump = compile_dump(schema)
+        return self.dump
+
+
+def _uses_loaders(schema, seen):
+    if schema.__class__ in seen:
+        return False
+    seen.add(schema.__class__)
+    for field in schema.plan.nested:
+        if field.loader is not None or _uses_loaders(schema.fields[field.name].schema, seen):
+            return True
+    return False
+
+
+def _root_links(schema):
+    # the links of the relationships reachable from ``schema``. Linked
+    # resources are described under their own type wherever they are reached
+    # from, so every schema class is walked once for them. Embedded resources
+    # are described under the path of fields embedding them (e.g.
+    # 'reservations.tickets.owner'), so they are walked once per path,
+    # without embedding a schema class twice
+    links = {}
+    seen = set([schema.__class__])
+    # (schema, prefix of its links, the schema classes embedding it)
+    stack = [(schema, schema.opts.type, (schema.__class__,))]
+    while stack:
+        schema, prefix, embedding = stack.pop()
+        for field in schema.plan.nested:
+            link = prefix + '.' + field.name
+            links[link] = {
+                'type': field.type
+            }
+            nested_schema = schema.fields[field.name].schema
+            nested_class = nested_schema.__class__
+            if field.embedded:
+                if nested_class not in embedding:
+                    stack.append((nested_schema, link, embedding + (nested_class,)))
+            elif nested_class not in seen:
+                seen.add(nested_class)
+                stack.append((nested_schema, field.type, (nested_class,)))
+    return links
+
+
+def _inlined_types(schema, seen):
+    if schema.__class__ in seen:
+        return set()
+    seen.add(schema.__class__)
+    types = set([schema.opts.type])
+    for field in schema.plan.embedded:
+        types.update(_inlined_types(schema.fields[field.name].schema, seen))
+    return types
+
+
+def _reaches_linked(schema, seen):
+    if schema.__class__ in seen:
+        return False
+    seen.add(schema.__class__)
+    plan = schema.plan
+    return bool(plan.linked) or any(_reaches_linked(schema.fields[field.name].schema, seen)
+                                    for field in plan.embedded)
+
+
+def _include_tree(paths):
+    tree = {}
+    for path in paths:
+        node = tree
+        for name in path.split('.'):
+            node = node.setdefault(name, {})
+    return tree
+
+
+_plans = {}
+
+
 class NamespaceOpts(SchemaOpts):
     def __init__(self, meta):
         SchemaOpts.__init__(self, meta)
         self.primary_key = getattr(meta, 'primary_key')
         self.type = getattr(meta, 'type')
         self.anonymous = getattr(meta, 'anonymous', False)
+        # a `serializer.cache.ResourceCache`, and the attribute versioning
+        # the resources in it
+        self.cache = getattr(meta, 'cache', None)
+        self.cache_version = getattr(meta, 'cache_version', None)
+        # the class of the objects `Schema.deserialize` builds, dicts if None
+        self.object_class = getattr(meta, 'object_class', None)
 
 
 class Schema(MSchema):
     OPTIONS_CLASS = NamespaceOpts
 
-    def serialize(self, obj, many=False, update_fields=True, **kwargs):
+    _compiled = False
 
-        data = self.dump(obj, many, update_fields, **kwargs).data
-        if many:
-            objects = []
-            linked = {}
-            links = data[0]['links'] if len(data) > 0 else {}
-            for obj in data:
-                for field_type in obj['linked'].keys():
-                    if field_type in obj['linked']:
-                        if field_type in linked:
-                            linked[field_type].extend(obj['linked'][field_type])
-                        else:
-                            linked[field_type] = obj['linked'][field_type]
-                        del obj['linked'][field_type]
-                objects.append(obj[self.opts.type])
-            return {
-                self.opts.type: objects,
-                'linked': linked,
-                'links': links
-            }
-        return data
+    #: A `serializer.profiling.Profiler` timing the serializations with this
+    #: schema, and the schemas it nests
+    profiler = None
+
+    # the `CompoundDocument` being serialized while the schema is dumping
+    # resources; None when it is the root of a new document. Set on nested
+    # schemas by their `Nested` field only for the duration of the call, so
+    # no schema keeps a document, and what it references, between requests
+    _document = None
+
+    @classmethod
+    def compile(cls):
+        """Dump resources of this schema, and of the schemas it nests, with
+        functions generated for the schema classes instead of through
+        marshmallow's marshaller and `Nested` fields.
+
+        Schemas using features the generated code doesn't support (a custom
+        accessor, ``prefix``, ``skip_missing``, or nested fields with
+        ``only``/``exclude``/``allow_null``) keep using the regular path.
+        Unlike the regular path, `additional` fields of nested resources are
+        formatted by the type of each value rather than that of the first
+        resource dumped.
+        """
+        cls._compiled = True
+
+    def serialize(self, obj, many=False, update_fields=True, identity_map=None, include=None,
+                  fieldsets=None, columnar=False, **kwargs):
+        """Serialize ``obj`` (or, with ``many``, a collection) to a compound
+        document.
+
+        :param IdentityMap identity_map: Resources to treat as already sent.
+        :param list include: Dotted paths of the `Linked` relationships to
+            side-load, e.g. ``['organization.owners']``. Relationships not on
+            any path are only referenced by id and never traversed. By default
+            everything reachable is side-loaded.
+        :param dict fieldsets: Maps resource types to the names of the only
+            fields to serialize for them. Ids and relationships are always
+            serialized.
+        :param bool columnar: Return the primary resources and every
+            ``linked`` bucket as columns, a dict from key to the list of its
+            values, built as the resources are dumped. See `Columns`.
+        """
+        if columnar:
+            return self._serialize_columnar(obj if many else [obj], identity_map, include, fieldsets,
+                                            **kwargs)
+        if not many:
+            return self.dump(obj, many, update_fields, identity_map, include, fieldsets, **kwargs).data
+
+        if self.plan.has_loaders(self):
+            obj = list(obj)
+        document = self._document = CompoundDocument(identity_map, include, fieldsets, self.profiler)
+        try:
+            if self.plan.has_loaders(self):
+                document.load_relationships(self, obj)
+            data = self.dump(obj, many, update_fields, **kwargs).data
+        finally:
+            self._document = None
+            document.finish()
+        return {
+            self.opts.type: [o.data for o in data],
+            'linked': document.linked_lists(),
+            'links': self.plan.root_links(self) if data else {}
+        }
 
-    def dump(self, obj, many=False, update_fields=True, **kwargs):
+    def _serialize_columnar(self, objs, identity_map, include, fieldsets, **kwargs):
+        # see the ``columnar`` argument of `serialize`; every primary resource
+        # is released once it has been appended to the columns
+        document = self._document = ColumnarDocument(identity_map, include, fieldsets, self.profiler)
+        primary = Columns()
+        try:
+            for chunk in _chunked(objs, 1000):
+                if self.plan.has_loaders(self):
+                    document.load_relationships(self, chunk)
+                for obj in chunk:
+                    primary.append(self.dump(obj, False, **kwargs).data.data)
+        finally:
+            self._document = None
+            document.finish()
+        return {
+            self.opts.type: primary.columns,
+            'linked': document.linked_lists(),
+            'links': self.plan.root_links(self) if primary.length else {}
+        }
+
+    def serialize_iter(self, objs, identity_map=None, include=None, fieldsets=None, **kwargs):
+        """Serialize an iterable of objects to a JSON document, yielding it in
+        chunks as it is produced. Only the side-loaded resources are held in
+        memory; each primary resource is encoded and released as soon as it
+        has been dumped, and ``linked``/``links`` are emitted at the end. See
+        `serialize` for the arguments.
+
+        The schema instance must not be used for anything else until the
+        generator is exhausted or closed.
+        """
+        return self._encode(objs, True, identity_map, include, fieldsets, **kwargs)
+
+    def serialize_json(self, obj, many=False, identity_map=None, include=None, fieldsets=None, **kwargs):
+        """Serialize like `serialize`, but straight to JSON. Every resource is
+        encoded as soon as it has been dumped, and side-loaded resources are
+        kept encoded in a buffer per type, so the whole document is never
+        held as dicts nor encoded in one go.
+        """
+        return ''.join(self._encode(obj if many else [obj], many, identity_map, include, fieldsets, **kwargs))
+
+    def _encode(self, objs, many, identity_map, include, fieldsets, **kwargs):
+        # yields the JSON of the document of ``objs``, see `serialize_iter`
+        dumps = self.opts.json_module.dumps
+        type_ = self.opts.type
+        document = self._document = EncodedDocument(dumps, identity_map, include, fieldsets, self.profiler)
+        try:
+            yield '{%s: %s' % (dumps(type_), '[' if many else '')
+            separator = ''
+            for chunk in _chunked(objs, 1000):
+                if self.plan.has_loaders(self):
+                    document.load_relationships(self, chunk)
+                for obj in chunk:
+                    result = self.dump(obj, False, **kwargs).data
+                    yield separator + dumps(result.data)
+                    separator = ', '
+        finally:
+            self._document = None
+            document.finish()
+        yield '%s, "linked": %s, "links": %s}' % (']' if many else '', document.linked_json(),
+                                                  dumps(self.plan.root_links(self) if separator else {}))
+
+    def serialize_to(self, fp, objs, identity_map=None, include=None, fieldsets=None, **kwargs):
+        """Like `serialize_iter`, but write the chunks to the file-like ``fp``."""
+        for chunk in self.serialize_iter(objs, identity_map, include, fieldsets, **kwargs):
+            fp.write(chunk)
+
+    def serialize_steps(self, obj, many=False, step_size=100, identity_map=None, is_pending=None,
+                        walk_size=1000):
+        """Serialize like `serialize`, but ``step_size`` objects at a time so an
+        event loop can run in between, resolving pending relationship values
+        (e.g. futures of lazily loaded `Linked` targets) on the way. See
+        `serializer.cooperative.SerializationSteps` for how to drive it.
+        """
+        from serializer.cooperative import SerializationSteps
+        return SerializationSteps(self, obj, many, step_size, identity_map, is_pending, walk_size)
+
+    def serialize_parallel(self, objs, processes=None, chunk_size=1000):
+        """Serialize a collection like ``serialize(objs, many=True)``, but in
+        chunks of ``chunk_size`` objects on a pool of worker processes (one per
+        CPU by default), merging the chunks' documents at the end.
+
+        The workers use a fresh instance of this schema's class, so the class
+        and the objects must be picklable.
+        """
+        from serializer.parallel import serialize_parallel
+        return serialize_parallel(self.__class__, objs, processes, chunk_size)
+
+    def deserialize(self, document):
+        """Build the object graph of a compound document serialized with this
+        schema: the primary resource, or a list of them, with relationships
+        resolved to the objects built from the side-loaded resources. See
+        `serializer.deserializer`.
+        """
+        from serializer.deserializer import deserialize
+        return deserialize(self, document)
+
+    def read_document(self, path, index_path=None):
+        """Open the compound document serialized with this schema at
+        ``path`` for reading single resources by type and id without parsing
+        the whole document, see `serializer.reader.DocumentReader`.
+        """
+        from serializer.reader import DocumentReader
+        return DocumentReader(path, self, index_path)
+
+    def serialize_lazy(self, obj, many=False, include=None, fieldsets=None):
+        """Serialize like `serialize`, but return a read-only document that
+        only serializes the primary resources and ``linked`` buckets that are
+        read, see `serializer.lazy.LazyDocument`.
+        """
+        from serializer.lazy import LazyDocument
+        return LazyDocument(self, obj, many, include, fieldsets)
+
+    def serialize_delta(self, obj, previous, many=False, **kwargs):
+        """Serialize like `serialize`, but return the diff against the
+        ``previous`` document (or its fingerprints) along with the new
+        document's fingerprints to diff the next one against, see
+        `serializer.delta`.
+
+        Combine with a versioned ``Meta.cache`` to only serialize the
+        resources whose source has changed.
+        """
+        from serializer.delta import diff_documents, document_fingerprints
+        document = self.serialize(obj, many, **kwargs)
+        type_ = self.opts.type
+        return diff_documents(type_, previous, document), document_fingerprints(type_, document)
+
+    def serialize_canonical(self, obj, many=False, **kwargs):
+        """Serialize like `serialize`, but to canonical JSON, which is the same
+        for the same objects byte for byte, see `serializer.canonical`.
+        Returns the JSON and an ETag for it.
+        """
+        from serializer.canonical import canonical_document, dumps, etag
+        body = dumps(canonical_document(self.serialize(obj, many, **kwargs)))
+        return body, etag(body)
+
+    def serialize_binary(self, obj, many=False, **kwargs):
+        """Serialize like `serialize`, but to a compact binary encoding with
+        the keys and types written once per document, see `serializer.binary`.
+        `serializer.binary.loads` turns it back into the dict `serialize`
+        returns.
+        """
+        from serializer.binary import dumps
+        return dumps(self.serialize(obj, many, **kwargs))
+
+    def serialize_batch(self, rows, columns=None):
+        """Serialize a homogeneous list of flat rows (dicts, or tuples whose
+        values are named by ``columns``) column by column instead of object by
+        object. Falls back to `serialize` for schemas that can't be batched.
+        """
+        rows = rows if isinstance(rows, list) else list(rows)
+        if columns is not None:
+            values = zip(*rows) if rows else [()] * len(columns)
+            return self.serialize_columns(dict(izip(columns, values)))
+        if not rows or type(rows[0]) is not dict:
+            return self.serialize(rows, many=True)
+        sources = [self.opts.primary_key] + [field.attribute or name for name, field in self.fields.items()]
+        columns = dict((source, [row.get(source) for row in rows]) for source in sources)
+        converted = self._convert_columns(columns, len(rows))
+        if converted is None:
+            # the columns only hold the fields' own attributes, which isn't
+            # enough for dotted attributes or fields reading other keys
+            return self.serialize(rows, many=True)
+        return self._serialize_converted(columns, converted)
+
+    def serialize_columns(self, columns):
+        """Serialize a collection given as columns, a mapping from attribute
+        name to a sequence of values (lists, tuples, or arrays with a
+        ``tolist`` method such as NumPy's). Every column must have the same
+        length, and the primary key must be one of them.
+        """
+        columns = dict((source, values.tolist() if hasattr(values, 'tolist') else values)
+                       for source, values in columns.items())
+        length = len(columns[self.opts.primary_key])
+
+        converted = self._convert_columns(columns, length)
+        if converted is None:
+            sources = columns.keys()
+            rows = [dict(izip(sources, values)) for values in izip(*columns.values())]
+            return self.serialize(rows, many=True)
+        return self._serialize_converted(columns, converted)
+
+    def _serialize_converted(self, columns, converted):
+        # the document of the fields converted by `_convert_columns`
+        names = [name for name, _ in converted]
+        values = [values for _, values in converted]
+        if not self.opts.anonymous:
+            names.append('id')
+            values.append(columns[self.opts.primary_key])
+
+        return {
+            self.opts.type: [dict(izip(names, row)) for row in izip(*values)],
+            'linked': {},
+            'links': {}
+        }
+
+    def _convert_columns(self, columns, length):
+        # serializes every field a whole column at a time, or returns None if
+        # some field can't be
+        if self.plan.nested or self.prefix or self.skip_missing:
+            return None
+        converted = []
+        missing = [None] * length
+        for name, field in self.fields.items():
+            source = field.attribute or name
+            if '.' in source:
+                return None
+            values = columns.get(source, missing)
+            if name in self.declared_fields:
+                format_ = _COLUMN_FORMATS.get(type(field), False)
+                if format_ is False or getattr(field, 'as_string', False):
+                    return None
+                try:
+                    values = _convert_declared(values, format_, field.default)
+                except (TypeError, ValueError):
+                    # left to the regular path, which records the error
+                    return None
+            else:
+                values = _convert_inferred(values)
+                if values is None:
+                    return None
+            converted.append((name, values))
+        return converted
+
+    def dump(self, obj, many=False, update_fields=True, identity_map=None, include=None,
+             fieldsets=None, **kwargs):
         many = self.many if many is None else bool(many)
         if many:
             self.many = False
+            if self._document is None and identity_map is None:
+                # the items are one serialization: resources they share are
+                # side-loaded with the first item linking to them
+                identity_map = IdentityMap()
             results = []
             errors = []
             for o in obj:
-                result, error = self.dump(o, False, update_fields, **kwargs)
+                result, error = self.dump(o, False, update_fields, identity_map, include, fieldsets, **kwargs)
                 results.append(result)
                 errors.append(error)
 
             return MarshalResult(results, errors)
+        elif self._document is None:
+            # this is the root of the compound document
+            document = self._document = CompoundDocument(identity_map, include, fieldsets, self.profiler)
+            try:
+                if self.plan.has_loaders(self):
+                    document.load_relationships(self, [obj])
+                result, errors = self.dump(obj, False, update_fields, **kwargs)
+            finally:
+                self._document = None
+                document.finish()
+            if not isinstance(result, Link):
+                result = {
+                    self.opts.type: result.data,
+                    'linked': document.linked_lists(),
+                    'links': self.plan.root_links(self)
+                }
+            return MarshalResult(result, errors)
         else:
-            if 'visited' not in self.context:
-                self.context['visited'] = dict()
-            key = utils.get_value(self.opts.primary_key, obj)
-            type_ = self.opts.type
-            if type_ not in self.context['visited']:
-                self.context['visited'][type_] = set()
-            if key in self.context['visited'][type_]:
-                return MarshalResult(Link(key), [])
-            self.context['visited'][type_].add(key)
-
-            return super(Schema, self).dump(obj, False, update_fields, **kwargs)
+            document = self._document
+            if document.deferred is not None:
+                return self._dump_profiled(obj, document, update_fields, **kwargs)
+            # the first resource of a graph: the `Linked` resources deferred
+            # while dumping it are dumped once it is done
+            document.deferred = deferred = []
+            try:
+                result = self._dump_profiled(obj, document, update_fields, **kwargs)
+                if deferred:
+                    document.dump_deferred(deferred)
+            finally:
+                document.deferred = None
+            return result
+
+    def _dump_profiled(self, obj, document, update_fields, **kwargs):
+        profiler = document.profiler
+        if profiler is None:
+            return self._dump_nested(obj, document, update_fields, **kwargs)
+        cache = self.opts.cache
+        hits = 0 if cache is None else cache.hits
+        profiler.enter(dump=True)
+        result = self._dump_nested(obj, document, update_fields, **kwargs)
+        profiler.exit('dump', self, result=result.data, cache_hit=cache is not None and cache.hits > hits)
+        return result
+
+    def _dump_nested(self, obj, document, update_fields, **kwargs):
+        plan = self.plan
+        key = plan.get_key(obj)
+        if not document.identity_map.visit(plan.type, key):
+            return MarshalResult(Link(key), [])
+        if self.opts.cache is not None:
+            return self._dump_cached(obj, key, document, update_fields, **kwargs)
+        return self._dump_resource(obj, document, update_fields, **kwargs)
+
+    def _dump_resource(self, obj, document, update_fields, **kwargs):
+        plan = self.plan
+        if self._compiled and not (self.prefix or self.skip_missing or document.profiler) and \
+                plan.compile(self) is not None:
+            return MarshalResult(plan.dump(self, obj, document), self._marshal.errors)
+        if plan.type in document.fieldsets:
+            return self._dump_fieldset(obj, document.fieldsets[plan.type], update_fields)
+
+        return super(Schema, self).dump(obj, False, update_fields, **kwargs)
+
+    def _dump_cached(self, obj, key, document, update_fields=False, **kwargs):
+        # `_dump_resource` through the schema's `ResourceCache`. The linked
+        # resources of a cached resource still have to be side-loaded, and
+        # resources dumped with a fieldset for them, or for a resource they
+        # embed, are never cached. The plan stands for the schema class and
+        # its field set
+        plan = self.plan
+        if document.fieldsets and not plan.inlined_types(self).isdisjoint(document.fieldsets):
+            return self._dump_resource(obj, document, update_fields, **kwargs)
+        cache = self.opts.cache
+        cache_key = (plan, plan.type, key, plan.get_version(obj) if plan.get_version else None)
+        result = cache.get(cache_key)
+        if result is not None:
+            previous, self._document = self._document, document
+            try:
+                for field in plan.replay_fields(self):
+                    self.fields[field.name].serialize(field.name, obj, accessor=self.__accessor__)
+            finally:
+                self._document = previous
+            return MarshalResult(_copy_result(result), [])
+
+        result, errors = self._dump_resource(obj, document, update_fields, **kwargs)
+        if not errors:
+            cache.set(cache_key, _copy_result(result))
+        return MarshalResult(result, errors)
+
+    def _dump_fieldset(self, obj, fieldset, update_fields):
+        # `marshmallow.Schema.dump` for only the fields in ``fieldset``, and
+        # the relationships
+        if update_fields:
+            self._update_fields(obj)
+        fields_dict = self.dict_class((name, field) for name, field in self.fields.items()
+                                      if name in fieldset or isinstance(field, Nested))
+        data = self._marshal(obj, fields_dict, many=False, strict=self.strict,
+                             skip_missing=self.skip_missing, accessor=self.__accessor__,
+                             dict_class=self.dict_class)
+        return MarshalResult(self._postprocess(data, obj), self._marshal.errors)
+
+    @property
+    def plan(self):
+        plan = self.__dict__.get('_plan')
+        if plan is None:
+            plan_key = (self.__class__, frozenset(self.fields))
+            plan = _plans.get(plan_key)
+            if plan is None:
+                plan = _plans[plan_key] = SerializationPlan(self)
+            self._plan = plan
+        return plan
 
     @property
     def nested_fields(self):
-        return [field for field in self.fields.values() if isinstance(field, Nested)]
+        return [self.fields[field.name] for field in self.plan.nested]
 
     @property
     def linked_fields(self):
-        return [field for field in self.fields.values() if isinstance(field, Linked)]
+        return [self.fields[field.name] for field in self.plan.linked]
 
     @property
     def embedded_fields(self):
-        return [field for field in self.fields.values() if isinstance(field, Embedded)]
+        return [self.fields[field.name] for field in self.plan.embedded]
 
-    def _extract_root_links(self, data):
+    def _add_links(self, data, plan):
         links = {}
-        for field in self.nested_fields:
-            links[self.opts.type + "." + field.name] = {
-                'type': field.schema.opts.type
-            }
-            if field.many:
-                links_ = next(ifilter(lambda x: not isinstance(x, Link), data[field.name]), {'links': {}})['links']
-            else:
-                if isinstance(data[field.name], Link):
-                    continue
-                links_ = data[field.name]['links']
-            if isinstance(field, Embedded):
-                for link, type_dict in links_.items():
-                    links[link.replace(field.schema.opts.type, self.opts.type + "." + field.name)] = type_dict
-            else:
-                links.update(links_)
-        return links
 
-    def _add_links(self, data):
-        links = {}
-
-        def get_id(link, type_):
-            return link.id if isinstance(link, Link) else link[type_]['id']
+        def get_id(link):
+            return link.id if isinstance(link, Link) else link.data['id']
 
-        for field in self.linked_fields:
-            type_ = field.schema.opts.type
+        for field in plan.linked:
             if field.many:
-                links[field.name] = [get_id(link, type_) for link in data[field.name]]
+                links[field.name] = [get_id(link) for link in data[field.name]]
             else:
-                links[field.name] = get_id(data[field.name], type_)
+                links[field.name] = get_id(data[field.name])
 
         if links:
             data['links'] = links
 
-    def _extract_linked(self, data):
-        linked = {}
-
-        def add_to_linked(b):
-            for key, val in b.items():
-                if key not in linked:
-                    linked[key] = val
-                else:
-                    linked[key].extend(val)
-
-        for field in self.nested_fields:
-            type_ = field.schema.opts.type
-
-            linked_list = data[field.name] if field.many else [data[field.name]]
-            for linked_ in linked_list:
-                if isinstance(linked_, Link):
-                    continue
-                add_to_linked(linked_['linked'])
-                if isinstance(field, Linked):
-                    add_to_linked({type_: [linked_[type_]]})
-
-        for field in self.embedded_fields:
-            type_ = field.schema.opts.type
-            if isinstance(field, Embedded):
-                if field.many:
-                    data[field.name] = [linked_[type_] for linked_ in data[field.name]]
-                else:
-                    data[field.name] = data[field.name][type_]
+    def _unwrap_nested(self, data, plan):
+        # linked resources have already been written to the compound document
+        # by their `Linked` field, so all that is left is to inline embedded
+        # resources and drop the linked ones
+        for field in plan.embedded:
+            if field.many:
+                data[field.name] = [linked_.data for linked_ in data[field.name]]
+            else:
+                data[field.name] = data[field.name].data
 
-        for field in self.linked_fields:
+        for field in plan.linked:
             del data[field.name]
 
-        return linked
-
     def _postprocess(self, data, obj):
+        profiler = self._document.profiler
+        if profiler is None:
+            return self._postprocess_resource(data, obj)
+        profiler.enter()
+        result = self._postprocess_resource(data, obj)
+        profiler.exit('postprocess', self)
+        return result
+
+    def _postprocess_resource(self, data, obj):
+        plan = self.plan
+
         # order is important here
-        self._add_links(data)
-        links = self._extract_root_links(data)
-        linked = self._extract_linked(data)
+        self._add_links(data, plan)
+        self._unwrap_nested(data, plan)
 
         # set attribute 'id' on all serialized objects if it is
         # supposed to have an identity
-        if not self.opts.anonymous:
-            data['id'] = utils.get_value(self.opts.primary_key, obj)
+        if not plan.anonymous:
+            data['id'] = plan.get_key(obj)
 
-        return {
-            self.opts.type: data,
-            'linked': linked,
-            'links': links
-        }
+        return Resource(data)
+
+
+# value formatting of the declared field types that can be applied a column
+# at a time; `None` means the value is passed through as is
+_COLUMN_FORMATS = {
+    fields.Field: None,
+    fields.Raw: None,
+    fields.String: utils.ensure_text_type,
+    fields.Integer: int,
+    fields.Float: float,
+    fields.Boolean: bool,
+}
+
+# value types that `additional` fields don't pass through as is, see
+# `Schema.TYPE_MAPPING`
+_FORMATTED_TYPES = frozenset(value_type for value_type, field_class in Schema.TYPE_MAPPING.items()
+                             if value_type is not unicode and
+                             field_class not in (fields.Raw, fields.Integer,
+                                                 fields.Float, fields.Boolean))
+
+
+def _convert_declared(values, format_, default):
+    # mirrors `fields.Field.serialize`, where missing values become the default
+    if default is null:
+        default = None
+    get_default = default if callable(default) else lambda: default
+    if format_ is None:
+        if default is None:
+            return values
+        return [get_default() if v is None else v for v in values]
+    return [get_default() if v is None else format_(v) for v in values]
 
 
-def _recur_find(keys, obj, default):
-    first_key = keys[0]
-    next_obj = utils.get_value(first_key, obj, default)
-    if len(keys) == 1:
-        return next_obj
-    if isinstance(next_obj, list):
-        return [_recur_find(keys[1:], o, default) for o in next_obj]
+def _convert_inferred(values):
+    # `additional` fields get their type from each object's value, so only
+    # byte strings need converting; returns None for values, such as dates,
+    # that are left to the regular path
+    formatted = _FORMATTED_TYPES.intersection(imap(type, values))
+    if not formatted:
+        return values
+    if formatted == _BYTES:
+        return [utils.ensure_text_type(v) if type(v) is str else v for v in values]
+    return None
+
+
+_BYTES = frozenset([str])
+
+
+def _copy_result(result):
+    # a copy of a nested dump result that shares no dicts or lists with it
+    return Resource(_copy_data(result.data))
+
+
+def _copy_data(value):
+    if type(value) is dict:
+        return dict((key, _copy_data(item)) for key, item in value.iteritems())
+    if type(value) is list:
+        return [_copy_data(item) for item in value]
+    return value
+
+
+def _chunked(objs, chunk_size):
+    objs = iter(objs)
+    while True:
+        chunk = list(islice(objs, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+_missing = object()
+
+
+def _compile_step(name, get_next, fan_out):
+    if hasattr(dict, name):
+        # dict attributes (e.g. 'items') shadow keys in `utils.get_value`
+        def get_one(obj, default=None):
+            return utils.get_value(name, obj, default)
     else:
-        return _recur_find(keys[1:], next_obj, default)
+        def get_one(obj, default=None):
+            if type(obj) is dict:
+                return obj.get(name, default)
+            value = getattr(obj, name, _missing)
+            if value is _missing:
+                return utils.get_value(name, obj, default)
+            return value
+
+    if get_next is None:
+        return get_one
+    if fan_out:
+        def get(obj, default=None):
+            value = get_one(obj, default)
+            if isinstance(value, list):
+                return [get_next(o, default) for o in value]
+            return get_next(value, default)
+    else:
+        def get(obj, default=None):
+            return get_next(get_one(obj, default), default)
+    return get
+
+
+def _compile_getter(key, fan_out=False):
+    """Compile `utils.get_value(key, obj, default)` for a fixed ``key`` into a
+    chain of closures, one per path segment, so the dotted path is only split
+    once. With ``fan_out``, a list found half way down the path is mapped over
+    by the rest of it.
+    """
+    if type(key) == int:
+        return lambda obj, default=None: utils.get_value(key, obj, default)
+
+    getter = None
+    for name in reversed(key.split('.')):
+        getter = _compile_step(name, getter, fan_out)
+    return getter
+
+
+_accessors = {}
+
 
 @Schema.accessor
 def find_many_to_one(schema, key, obj, default=None):
-    return _recur_find(key.split('.'), obj, default)
+    getter = _accessors.get(key)
+    if getter is None:
+        getter = _accessors[key] = _compile_getter(key, fan_out=True)
+    return getter(obj, default)
@@ -1,6 +1,6 @@
 import unittest
 
-from serializer.schema import Linked, Schema
+from serializer.schema import Linked, Schema, find_many_to_one
 
 
 class AccessorTest(unittest.TestCase):
@@ -57,3 +57,48 @@ class AccessorTest(unittest.TestCase):
                 }
             }
         })
+
+    def test_objects_and_nested_lists(self):
+        class Organization(object):
+            def __init__(self, organization_id, name):
+                self.organization_id = organization_id
+                self.name = name
+
+        class Membership(object):
+            def __init__(self, organization):
+                self.organization = organization
+
+        class TeamOrganizationSchema(Schema):
+            class Meta:
+                primary_key = 'organization_id'
+                type = 'organizations'
+
+                additional = ('name',)
+
+        class TeamSchema(Schema):
+            class Meta:
+                primary_key = 'team_id'
+                type = 'teams'
+
+                additional = ()
+
+            organizations = Linked(TeamOrganizationSchema, many=True, attribute="info.memberships.organization")
+
+        team = {
+            "team_id": 1,
+            "info": {
+                "memberships": [Membership(Organization(2, "Brukbar")), Membership(Organization(3, "Samfundet"))]
+            }
+        }
+
+        serialized_team = TeamSchema().serialize(team)
+
+        self.assertEqual(serialized_team['teams']['links'], {'organizations': [2, 3]})
+        self.assertEqual(serialized_team['linked']['organizations'], [
+            {'id': 2, 'name': 'Brukbar'},
+            {'id': 3, 'name': 'Samfundet'}
+        ])
+
+    def test_missing_values(self):
+        self.assertIsNone(find_many_to_one(None, 'a.b.c', {'a': {}}))
+        self.assertEqual(find_many_to_one(None, 'a.b', {'a': [{'b': 1}, {}]}, 0), [1, 0])
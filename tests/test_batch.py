@@ -0,0 +1,114 @@
+import unittest
+from datetime import datetime
+
+from serializer.schema import Schema, fields
+from tests.test_many import EventSchema, events
+
+
+class TicketTypeBatchSchema(Schema):
+    class Meta:
+        primary_key = 'ticket_type_id'
+        type = 'ticket_types'
+
+        additional = ('name', 'price', 'fee')
+
+
+ticket_types = [{
+    'ticket_type_id': i,
+    'name': u'Type %d' % i,
+    'price': 100 * i,
+    'fee': None if i % 2 else 15
+} for i in range(5)]
+
+
+class BatchTest(unittest.TestCase):
+    def test_rows_match_serialize(self):
+        self.assertDictEqual(TicketTypeBatchSchema().serialize_batch(ticket_types),
+                             TicketTypeBatchSchema().serialize(ticket_types, many=True))
+
+    def test_tuple_rows(self):
+        columns = ('ticket_type_id', 'name', 'price', 'fee')
+        rows = [tuple(ticket_type[column] for column in columns) for ticket_type in ticket_types]
+
+        self.assertDictEqual(TicketTypeBatchSchema().serialize_batch(rows, columns=columns),
+                             TicketTypeBatchSchema().serialize(ticket_types, many=True))
+
+    def test_columns(self):
+        serialized = TicketTypeBatchSchema().serialize_columns({
+            'ticket_type_id': [1, 2],
+            'name': (u'Student', u'Ordinary'),
+            'price': [100, 200],
+            'fee': [10, None]
+        })
+
+        self.assertDictEqual(serialized, {
+            'ticket_types': [
+                {'id': 1, 'name': u'Student', 'price': 100, 'fee': 10},
+                {'id': 2, 'name': u'Ordinary', 'price': 200, 'fee': None}
+            ],
+            'linked': {},
+            'links': {}
+        })
+
+    def test_empty(self):
+        self.assertDictEqual(TicketTypeBatchSchema().serialize_batch([]), {
+            'ticket_types': [],
+            'linked': {},
+            'links': {}
+        })
+
+    def test_falls_back_for_nested_schemas(self):
+        self.assertDictEqual(EventSchema().serialize_batch(events),
+                             EventSchema().serialize(events, many=True))
+
+    def test_declared_fields_and_formatted_values(self):
+        class PricedSchema(Schema):
+            class Meta:
+                primary_key = 'ticket_type_id'
+                type = 'ticket_types'
+
+                additional = ('name', 'created')
+
+            price = fields.Integer()
+
+        rows = [{
+            'ticket_type_id': i,
+            'name': 'Type %d' % i,
+            'price': None if i else '100',
+            'created': datetime(2014, 8, 19, 11, 13, i)
+        } for i in range(3)]
+
+        serialized = PricedSchema().serialize_batch(rows)
+
+        self.assertDictEqual(serialized, PricedSchema().serialize(rows, many=True))
+        self.assertEqual([row['price'] for row in serialized['ticket_types']], [100, 0, 0])
+        self.assertEqual(PricedSchema().serialize_batch([dict(row, created=None) for row in rows]),
+                         PricedSchema().serialize([dict(row, created=None) for row in rows], many=True))
+
+    def test_invalid_values_fall_back(self):
+        class CountedSchema(Schema):
+            class Meta:
+                primary_key = 'ticket_type_id'
+                type = 'ticket_types'
+
+            count = fields.Integer()
+
+        rows = [{'ticket_type_id': 1, 'count': '3'}, {'ticket_type_id': 2, 'count': 'abc'}]
+
+        self.assertDictEqual(CountedSchema().serialize_batch(rows), CountedSchema().serialize(rows, many=True))
+
+    def test_fields_reading_other_keys_fall_back(self):
+        class PersonSchema(Schema):
+            class Meta:
+                primary_key = 'person_id'
+                type = 'people'
+
+            title = fields.String(attribute='info.title')
+            full_name = fields.Function(lambda person: '%s %s' % (person['first'], person['last']))
+
+        rows = [{'person_id': 1, 'info': {'title': 'hello'}, 'first': 'Ada', 'last': 'Lovelace'}]
+
+        serialized = PersonSchema().serialize_batch(rows)
+
+        self.assertDictEqual(serialized, PersonSchema().serialize(rows, many=True))
+        self.assertEqual(serialized['people'][0]['full_name'], 'Ada Lovelace')
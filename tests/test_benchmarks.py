@@ -0,0 +1,21 @@
+import unittest
+
+from benchmarks.graphs import GRAPHS
+from benchmarks.runner import compare, count_allocations
+
+
+class BenchmarkTest(unittest.TestCase):
+    def test_graphs_serialize(self):
+        for name, generate in GRAPHS:
+            objs, schema_class = generate(4)
+            serialized = schema_class().serialize(objs, many=True)
+
+            self.assertEqual(len(serialized[schema_class.Meta.type]), 4, name)
+            self.assertGreater(count_allocations('serialize', generate, 4), 0, name)
+
+    def test_compare(self):
+        baseline = {'flat': {'serialize': {'objects_per_sec': 1000.0, 'peak_kib': 100.0}}}
+        results = {'flat': {'serialize': {'objects_per_sec': 800.0, 'peak_kib': 105.0}},
+                   'chain': {'serialize': {'objects_per_sec': 1.0, 'peak_kib': 1.0}}}
+
+        self.assertEqual(compare(baseline, results), [('flat', 'serialize', 'objects_per_sec', 1000.0, 800.0)])
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+import json
+import unittest
+
+from serializer import binary
+from tests.test_document import FriendsSchema, make_users
+from tests.test_embedding import ReservationSchema, reservation
+from tests.test_many import EventSchema, events
+
+
+class BinaryTest(unittest.TestCase):
+    def test_round_trip(self):
+        for schema, obj, many in [(EventSchema(), events, True), (EventSchema(), [], True),
+                                  (ReservationSchema(), reservation, False)]:
+            encoded = schema.serialize_binary(obj, many)
+            self.assertEqual(binary.loads(encoded), schema.serialize(obj, many))
+
+    def test_values(self):
+        document = {
+            'events': [{'id': 1, 'price': 12.5, 'name': u'Sigur R\xf3s', 'big': 2 ** 70, 'negative': -300,
+                        'flags': [True, False, None]}, {'id': 2, 'nested': {'a': [{'b': 'c'}]}}],
+            'linked': {'users': [{'id': 'x', 'links': {'friends': ['y']}}]},
+            'links': {'events.organizer': {'type': 'users'}}
+        }
+
+        self.assertEqual(binary.loads(binary.dumps(document)), document)
+
+    def test_smaller_than_json(self):
+        friends = make_users(50)
+        for user in friends[10:]:
+            user['friends'] = friends[user['user_id'] % 10:][:3]
+
+        document = FriendsSchema().serialize(friends[10:], many=True)
+        encoded = FriendsSchema().serialize_binary(friends[10:], many=True)
+
+        self.assertEqual(encoded.count(b'name'), 1)
+        self.assertLess(len(encoded), len(json.dumps(document)) / 2)
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, binary.loads, b'{"events": []}')
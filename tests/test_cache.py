@@ -0,0 +1,159 @@
+import unittest
+
+from serializer.cache import ResourceCache
+from serializer.schema import Embedded, Linked, Schema
+from tests.test_compiler import compiled
+from tests.test_many import EventSchema, UserManySchema, events
+
+organizations = ResourceCache(max_size=10)
+
+
+class CachedOrganizationSchema(Schema):
+    class Meta:
+        primary_key = 'organization_id'
+        type = 'organizations'
+        cache = organizations
+        cache_version = 'version'
+
+        additional = ()
+
+    owners = Linked(UserManySchema, many=True, attribute='users')
+
+
+class CachedEventSchema(Schema):
+    class Meta:
+        primary_key = 'event_id'
+        type = 'events'
+
+        additional = ('name',)
+
+    organization = Linked(CachedOrganizationSchema)
+
+
+class CachedTicketSchema(Schema):
+    class Meta:
+        primary_key = 'ticket_id'
+        type = 'tickets'
+
+        additional = ('name', 'price')
+
+
+class CachedVenueSchema(Schema):
+    class Meta:
+        primary_key = 'organization_id'
+        type = 'organizations'
+        cache = organizations
+
+        additional = ('name', 'city')
+
+    owners = Linked(UserManySchema, many=True, attribute='users')
+    tickets = Embedded(CachedTicketSchema, many=True)
+
+
+class FullVenueEventSchema(Schema):
+    class Meta:
+        primary_key = 'event_id'
+        type = 'events'
+
+    organization = Linked(CachedVenueSchema)
+
+
+class TrimmedVenueEventSchema(Schema):
+    class Meta:
+        primary_key = 'event_id'
+        type = 'events'
+
+    organization = Linked(CachedVenueSchema, exclude=('city',))
+
+
+venue_event = {
+    'event_id': 1,
+    'organization': {
+        'organization_id': 1,
+        'name': 'Rockefeller',
+        'city': 'Oslo',
+        'users': [{'user_id': 1}],
+        'tickets': [{'ticket_id': 1, 'name': 'Standing', 'price': 300}]
+    }
+}
+
+
+class Clock(object):
+    now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class CacheTest(unittest.TestCase):
+    def setUp(self):
+        organizations.clear()
+        organizations.hits = organizations.misses = 0
+
+    def test_hits(self):
+        expected = EventSchema().serialize(events, many=True)
+
+        for schema_class in [CachedEventSchema, CachedEventSchema, compiled(CachedEventSchema)]:
+            self.assertEqual(schema_class().serialize(events, many=True), expected)
+        # the compiled subclass nests the same organization schema
+        self.assertEqual((organizations.hits, organizations.misses), (4, 2))
+
+    def test_version(self):
+        event = dict(events[1], organization=dict(events[1]['organization'], version=1))
+        CachedEventSchema().serialize(event)
+        event['organization']['version'] = 2
+        CachedEventSchema().serialize(event)
+
+        self.assertEqual((organizations.hits, organizations.misses), (0, 2))
+
+    def test_invalidate(self):
+        CachedEventSchema().serialize(events, many=True)
+        organizations.invalidate('organizations', 2)
+        self.assertEqual(len(organizations), 1)
+
+        organizations.invalidate('organizations')
+        self.assertEqual(len(organizations), 0)
+
+    def test_eviction(self):
+        clock = Clock()
+        cache = ResourceCache(max_size=2, ttl=10, timer=clock)
+        cache.set((None, 'users', 1, None), 'a')
+        cache.set((None, 'users', 2, None), 'b')
+        cache.get((None, 'users', 1, None))
+        cache.set((None, 'users', 3, None), 'c')
+
+        self.assertIsNone(cache.get((None, 'users', 2, None)))
+        self.assertEqual(cache.get((None, 'users', 1, None)), 'a')
+        clock.now = 10
+        self.assertIsNone(cache.get((None, 'users', 1, None)))
+        self.assertEqual(len(cache), 1)
+
+    def test_field_sets_are_cached_separately(self):
+        TrimmedVenueEventSchema().serialize(venue_event)
+        full = FullVenueEventSchema().serialize(venue_event)['linked']['organizations'][0]
+
+        self.assertEqual(full['city'], 'Oslo')
+        self.assertEqual(TrimmedVenueEventSchema().serialize(venue_event)['linked']['organizations'][0],
+                         dict((key, value) for key, value in full.items() if key != 'city'))
+
+    def test_embedded_fieldsets_bypass_the_cache(self):
+        def tickets(**kwargs):
+            serialized = FullVenueEventSchema().serialize(venue_event, **kwargs)
+            return serialized['linked']['organizations'][0]['tickets']
+
+        self.assertEqual(tickets(fieldsets={'tickets': ['name']}), [{'id': 1, 'name': 'Standing'}])
+        self.assertEqual(tickets(), [{'id': 1, 'name': 'Standing', 'price': 300}])
+        self.assertEqual(tickets(fieldsets={'tickets': ['name']}), [{'id': 1, 'name': 'Standing'}])
+        self.assertEqual(organizations.hits, 0)
+
+    def test_served_resources_are_copies(self):
+        first = FullVenueEventSchema().serialize(venue_event)['linked']['organizations'][0]
+        first['links']['owners'].append(99)
+        first['tickets'][0]['price'] = 0
+        second = FullVenueEventSchema().serialize(venue_event)['linked']['organizations'][0]
+        second['links']['owners'].append(98)
+
+        third = FullVenueEventSchema().serialize(venue_event)['linked']['organizations'][0]
+        self.assertEqual(third['links']['owners'], [1])
+        self.assertEqual(third['tickets'][0]['price'], 300)
+        self.assertEqual(organizations.hits, 2)
@@ -0,0 +1,27 @@
+import json
+import unittest
+
+from serializer.canonical import canonical_document, fingerprint
+from tests.test_many import EventSchema, events
+
+
+class CanonicalTest(unittest.TestCase):
+    def test_linked_sorted_by_id(self):
+        document = EventSchema().serialize(events, many=True)
+        document['linked']['users'].reverse()
+
+        canonical = canonical_document(document)
+
+        self.assertEqual(canonical['linked']['users'], [{'id': 1}, {'id': 2}])
+        self.assertEqual(document['linked']['users'], [{'id': 2}, {'id': 1}])
+
+    def test_etag(self):
+        body, etag = EventSchema().serialize_canonical(events, many=True)
+
+        self.assertEqual(json.loads(body), EventSchema().serialize(events, many=True))
+        self.assertEqual(EventSchema().serialize_canonical(events, many=True), (body, etag))
+        self.assertNotEqual(EventSchema().serialize_canonical(events[:1], many=True)[1], etag)
+
+    def test_fingerprint(self):
+        self.assertEqual(fingerprint({'id': 1, 'name': 'a'}), fingerprint({'name': 'a', 'id': 1}))
+        self.assertNotEqual(fingerprint({'id': 1, 'name': 'a'}), fingerprint({'id': 1, 'name': 'b'}))
@@ -0,0 +1,61 @@
+import unittest
+
+from tests.test_embedding import ReservationSchema, reservation
+from tests.test_loader import LoadedEventSchema, loaded_events
+from tests.test_many import EventSchema, events
+from tests.test_stream import MixedEventSchema, mixed_events
+
+
+class ColumnarTest(unittest.TestCase):
+    def test_columns(self):
+        serialized = EventSchema().serialize(events, many=True, columnar=True)
+
+        self.assertEqual(serialized, {
+            'events': {
+                'id': [1, 2],
+                'name': ['Snoop Dogg', 'Justin Bieber'],
+                'links.organization': [1, 2]
+            },
+            'linked': {
+                'organizations': {'id': [1, 2], 'links.owners': [[], [1, 2]]},
+                'users': {'id': [1, 2]}
+            },
+            'links': EventSchema().serialize(events, many=True)['links']
+        })
+
+    def test_mixed_types(self):
+        columns = MixedEventSchema().serialize(mixed_events, many=True, columnar=True)['events']
+        rows = MixedEventSchema().serialize(mixed_events, many=True)['events']
+
+        for key in ('id', 'name', 'starts_at'):
+            self.assertEqual(columns[key], [row[key] for row in rows])
+
+    def test_matches_serialize(self):
+        for schema, obj, many in [(LoadedEventSchema(), loaded_events, True),
+                                  (ReservationSchema(), reservation, False)]:
+            columnar = schema.serialize(obj, many, columnar=True)
+            document = schema.serialize(obj, many)
+            primary = document[schema.opts.type] if many else [document[schema.opts.type]]
+
+            self.assertEqual(columnar[schema.opts.type], columns(primary))
+            self.assertEqual(columnar['linked'], dict((type_, columns(resources))
+                                                      for type_, resources in document['linked'].items()))
+            self.assertEqual(columnar['links'], document['links'])
+
+    def test_missing_keys(self):
+        serialized = EventSchema().serialize([], many=True, columnar=True)
+        self.assertEqual(serialized, {'events': {}, 'linked': {}, 'links': {}})
+
+        serialized = EventSchema().serialize(events, many=True, columnar=True,
+                                             fieldsets={'events': ['name']}, include=[])
+        self.assertEqual(serialized['linked'], {})
+        self.assertEqual(serialized['events']['links.organization'], [1, 2])
+
+
+def columns(resources):
+    keys = set()
+    for resource in resources:
+        keys.update(key for key in resource if key != 'links')
+        keys.update('links.' + name for name in resource.get('links', {}))
+    return dict((key, [resource['links'].get(key[6:]) if key.startswith('links.') else resource.get(key)
+                       for resource in resources]) for key in keys)
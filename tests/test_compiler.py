@@ -0,0 +1,98 @@
+import unittest
+
+import marshmallow
+
+from serializer.schema import Embedded, Linked, Schema
+from tests import test_cycles, test_embedding, test_many, test_one_to_many
+
+
+def compiled(schema_class):
+    compiled_class = type('Compiled' + schema_class.__name__, (schema_class,), {})
+    compiled_class.compile()
+    return compiled_class
+
+
+class CompilerTest(unittest.TestCase):
+    def assertSameOutput(self, schema_class, obj, many=False):
+        self.assertDictEqual(compiled(schema_class)().serialize(obj, many=many),
+                             schema_class().serialize(obj, many=many))
+
+    def test_nested_documents(self):
+        self.assertSameOutput(test_one_to_many.UserSchema, test_one_to_many.user_E)
+        self.assertSameOutput(test_one_to_many.OrganizationSchema, test_one_to_many.organization_B)
+        self.assertSameOutput(test_one_to_many.AdminSchema, test_one_to_many.admin_A)
+
+    def test_many(self):
+        self.assertSameOutput(test_many.EventSchema, test_many.events, many=True)
+        self.assertSameOutput(test_many.EventSchema, [], many=True)
+
+    def test_embedding(self):
+        self.assertSameOutput(test_embedding.ReservationSchema, test_embedding.reservation)
+
+    def test_cycles(self):
+        user_1 = {"user_id": 1, "name": "Alice"}
+        user_2 = {"user_id": 2, "name": "Bob", "best_friend": user_1}
+        user_1['best_friend'] = user_2
+
+        self.assertSameOutput(test_cycles.UserBestFriendSchema, user_1)
+
+    def test_generated_function_is_used(self):
+        schema_class = compiled(test_one_to_many.OrganizationSchema)
+        schema = schema_class()
+        schema.serialize(test_one_to_many.organization_B)
+
+        self.assertIsNotNone(schema.plan.dump)
+
+    def test_generated_function_is_used_for_linked_resources(self):
+        dumped = []
+        dump = marshmallow.Schema.dump
+
+        def spy(schema, *args, **kwargs):
+            dumped.append(schema.__class__)
+            return dump(schema, *args, **kwargs)
+
+        marshmallow.Schema.dump = spy
+        try:
+            compiled(test_many.EventSchema)().serialize(test_many.events, many=True)
+        finally:
+            marshmallow.Schema.dump = dump
+
+        self.assertEqual(dumped, [])
+
+    def test_unsupported_schema_falls_back(self):
+        class OnlyNameSchema(Schema):
+            class Meta:
+                primary_key = 'organization_id'
+                type = 'organizations'
+
+                additional = ('name',)
+
+            owner = Linked(test_one_to_many.UserSchema, only=('name',))
+
+        OnlyNameSchema.compile()
+        schema = OnlyNameSchema()
+        schema.serialize(test_one_to_many.organization_B)
+
+        self.assertTrue(schema.plan.compiled)
+        self.assertIsNone(schema.plan.dump)
+
+    def test_nested_skip_missing_falls_back(self):
+        class SkipMissingTicketSchema(Schema):
+            class Meta:
+                primary_key = 'ticket_id'
+                type = 'tickets'
+                skip_missing = True
+
+                additional = ('price',)
+
+        class SkipMissingOrderSchema(Schema):
+            class Meta:
+                primary_key = 'order_id'
+                type = 'orders'
+
+            tickets = Embedded(SkipMissingTicketSchema, many=True)
+
+        order = {'order_id': 1, 'tickets': [{'ticket_id': 1, 'price': None}, {'ticket_id': 2, 'price': 10}]}
+
+        self.assertSameOutput(SkipMissingOrderSchema, order)
+        self.assertEqual(SkipMissingOrderSchema().serialize(order)['orders']['tickets'][0], {'id': 1})
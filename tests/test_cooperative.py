@@ -0,0 +1,96 @@
+import unittest
+
+from tests.test_compiler import compiled
+from tests.test_cycles import UserBestFriendSchema
+from tests.test_many import EventSchema, events
+from tests.test_one_to_many import AdminSchema, admin_A
+from tests.test_stream import MixedEventSchema, mixed_events
+
+
+class Pending(object):
+    def __init__(self, value):
+        self.value = value
+
+    def add_done_callback(self, callback):
+        pass
+
+
+def drive(steps):
+    """Runs the steps like an event loop would, returning the number of times
+    it was given control and the batches of pending values it resolved."""
+    yields = 0
+    batches = []
+    step = iter(steps)
+    try:
+        pending = next(step)
+        while True:
+            yields += 1
+            if pending:
+                batches.append(pending)
+            pending = step.send([value.value for value in pending] if pending else None)
+    except StopIteration:
+        pass
+    return yields, batches
+
+
+class CooperativeTest(unittest.TestCase):
+    def test_matches_serialize(self):
+        steps = EventSchema().serialize_steps(events, many=True, step_size=1)
+
+        yields, batches = drive(steps)
+
+        self.assertEqual(yields, 1)
+        self.assertEqual(batches, [])
+        self.assertDictEqual(steps.result, EventSchema().serialize(events, many=True))
+
+    def test_mixed_types(self):
+        steps = MixedEventSchema().serialize_steps(mixed_events, many=True, step_size=2)
+
+        drive(steps)
+
+        self.assertDictEqual(steps.result, MixedEventSchema().serialize(mixed_events, many=True))
+
+    def test_pending_relationships(self):
+        users = [Pending(user) for user in events[1]['organization']['users']]
+        lazy_events = [
+            dict(events[0], organization=Pending(events[0]['organization'])),
+            dict(events[1], organization=Pending(dict(events[1]['organization'], users=users)))
+        ]
+        steps = EventSchema().serialize_steps(lazy_events, many=True)
+
+        yields, batches = drive(steps)
+
+        self.assertEqual([len(batch) for batch in batches], [2, 2])
+        self.assertDictEqual(steps.result, EventSchema().serialize(events, many=True))
+
+    def test_pending_collection(self):
+        lazy_admin = dict(admin_A, orgs=Pending(admin_A['orgs']))
+        steps = AdminSchema().serialize_steps(lazy_admin)
+
+        drive(steps)
+
+        self.assertDictEqual(steps.result, AdminSchema().serialize(admin_A))
+
+    def test_compiled_schema(self):
+        lazy_events = [dict(event, organization=Pending(event['organization'])) for event in events]
+        steps = compiled(EventSchema)().serialize_steps(lazy_events, many=True)
+
+        drive(steps)
+
+        self.assertDictEqual(steps.result, EventSchema().serialize(events, many=True))
+
+    def test_long_walks_yield(self):
+        chain = [{'user_id': i, 'name': str(i)} for i in range(50)]
+        for user, best_friend in zip(chain, chain[1:]):
+            user['best_friend'] = best_friend
+        chain[-1]['best_friend'] = Pending(chain[0])
+        heads = [{'user_id': 100 + i, 'name': 'head', 'best_friend': chain[0]} for i in range(3)]
+        steps = UserBestFriendSchema().serialize_steps(heads, many=True, step_size=1, walk_size=10)
+
+        yields, batches = drive(steps)
+
+        # the chain is walked once, in slices of 10 objects, by the first step
+        self.assertEqual(yields, 5 + 1 + 2)
+        self.assertEqual(len(batches), 1)
+        chain[-1]['best_friend'] = chain[0]
+        self.assertDictEqual(steps.result, UserBestFriendSchema().serialize(heads, many=True))
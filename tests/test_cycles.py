@@ -1,3 +1,4 @@
+import sys
 import unittest
 
 from serializer.schema import Linked, Schema
@@ -177,3 +178,19 @@ class CyclicSchemaTest(unittest.TestCase):
                 }
             }
         })
+
+    def test_long_chain(self):
+        from tests.test_compiler import compiled
+
+        users = [{'user_id': i, 'name': str(i)} for i in range(sys.getrecursionlimit() * 2)]
+        for user, best_friend in zip(users, users[1:]):
+            user['best_friend'] = best_friend
+        users[-1]['best_friend'] = users[0]
+
+        serialized = UserBestFriendSchema().serialize(users[0])
+
+        self.assertEqual(serialized['users']['links'], {'best_friend': 1})
+        self.assertEqual([user['id'] for user in serialized['linked']['users']], range(len(users) - 1, 0, -1))
+        self.assertEqual(serialized['linked']['users'][0]['links'], {'best_friend': 0})
+        self.assertEqual(compiled(UserBestFriendSchema)().serialize(users[0]), serialized)
+        self.assertEqual(UserBestFriendSchema().serialize_lazy(users[0]), serialized)
@@ -0,0 +1,36 @@
+import copy
+import unittest
+
+from serializer.delta import diff_documents
+from tests.test_many import EventSchema, events
+
+
+class DeltaTest(unittest.TestCase):
+    def test_full_document(self):
+        diff, _ = EventSchema().serialize_delta(events, None, many=True)
+        expected = EventSchema().serialize(events, many=True)
+
+        self.assertEqual(diff['events'], expected['events'])
+        self.assertEqual(diff['linked'], expected['linked'])
+        self.assertEqual(diff['links'], expected['links'])
+        self.assertEqual(diff['removed'], {'events': [], 'linked': {}})
+
+    def test_changes(self):
+        _, fingerprints = EventSchema().serialize_delta(events, None, many=True)
+        changed = copy.deepcopy(events)
+        changed[0]['name'] = 'Snoop Lion'
+        changed[1]['organization']['users'].pop()
+
+        diff, _ = EventSchema().serialize_delta(changed, fingerprints, many=True)
+
+        self.assertEqual(diff['events'], [{'id': 1, 'name': 'Snoop Lion', 'links': {'organization': 1}}])
+        self.assertEqual(diff['linked'], {'organizations': [{'id': 2, 'links': {'owners': [1]}}]})
+        self.assertEqual(diff['links'], {})
+        self.assertEqual(diff['removed'], {'events': [], 'linked': {'users': [2]}})
+
+    def test_previous_document(self):
+        previous = EventSchema().serialize(events, many=True)
+        diff = diff_documents('events', previous, EventSchema().serialize(events[:1], many=True))
+
+        self.assertEqual(diff['events'], [])
+        self.assertEqual(diff['removed'], {'events': [2], 'linked': {'organizations': [2], 'users': [1, 2]}})
@@ -0,0 +1,68 @@
+import unittest
+
+from serializer.schema import Linked, Schema
+from tests.test_cycles import UserBestFriendSchema
+from tests.test_embedding import ReservationSchema, reservation
+from tests.test_many import EventSchema, events
+
+
+class User(object):
+    pass
+
+
+class ObjectUserSchema(Schema):
+    class Meta:
+        primary_key = 'user_id'
+        type = 'users'
+        object_class = User
+
+        additional = ('name',)
+
+    best_friend = Linked('self')
+
+
+class DeserializeTest(unittest.TestCase):
+    def test_round_trip(self):
+        self.assertEqual(EventSchema().deserialize(EventSchema().serialize(events, many=True)), events)
+
+    def test_embedded(self):
+        deserialized = ReservationSchema().deserialize(ReservationSchema().serialize(reservation))
+
+        self.assertEqual(deserialized, reservation)
+        tickets = deserialized['ticket_reservations']
+        self.assertIs(tickets[0]['ticket_type'], tickets[1]['ticket_type'])
+
+    def test_cycles_share_objects(self):
+        first, second = {'user_id': 1, 'name': 'a'}, {'user_id': 2, 'name': 'b'}
+        first['best_friend'], second['best_friend'] = second, first
+
+        user = UserBestFriendSchema().deserialize(UserBestFriendSchema().serialize(first))
+
+        self.assertEqual(user['best_friend']['name'], 'b')
+        self.assertIs(user['best_friend']['best_friend'], user)
+
+    def test_objects(self):
+        document = {'users': {'id': 1, 'name': 'a', 'links': {'best_friend': 2}}, 'linked': {}, 'links': {}}
+
+        user = ObjectUserSchema().deserialize(document)
+
+        self.assertIsInstance(user, User)
+        self.assertEqual((user.user_id, user.name), (1, 'a'))
+        self.assertEqual(user.best_friend.__dict__, {'user_id': 2})
+
+    def test_long_chain(self):
+        users = [{'user_id': i, 'name': str(i)} for i in range(5000)]
+        for user, best_friend in zip(users, users[1:] + users[:1]):
+            user['best_friend'] = best_friend
+        document = {
+            'users': {'id': 0, 'name': '0', 'links': {'best_friend': 1}},
+            'linked': {'users': [{'id': i, 'name': str(i), 'links': {'best_friend': (i + 1) % 5000}}
+                                 for i in range(1, 5000)]},
+            'links': {}
+        }
+
+        user = UserBestFriendSchema().deserialize(document)
+
+        for _ in range(5000):
+            user = user['best_friend']
+        self.assertEqual(user['user_id'], 0)
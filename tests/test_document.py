@@ -0,0 +1,59 @@
+import unittest
+
+from serializer.schema import CompoundDocument, Link, Linked, Resource, Schema
+
+
+class FriendsSchema(Schema):
+    class Meta:
+        primary_key = 'user_id'
+        type = 'users'
+
+        additional = ('name',)
+
+    friends = Linked('self', many=True)
+
+
+def make_users(count):
+    return [{'user_id': i, 'name': str(i), 'friends': []} for i in range(count)]
+
+
+class CompoundDocumentTest(unittest.TestCase):
+    def test_linked_order_follows_traversal(self):
+        users = make_users(6)
+        users[1]['friends'] = [users[2], users[3]]
+        users[2]['friends'] = [users[4]]
+        users[3]['friends'] = [users[5], users[1]]
+
+        """
+            1 -> 2 -> 4
+            1 -> 3 -> 5
+                 3 -> 1
+        """
+
+        serialized = FriendsSchema().serialize(users[1])
+
+        self.assertEqual([user['id'] for user in serialized['linked']['users']], [4, 2, 5, 3])
+        self.assertEqual(serialized['users']['links'], {'friends': [2, 3]})
+
+    def test_many_shares_one_document(self):
+        users = make_users(4)
+        users[0]['friends'] = [users[2], users[3]]
+        users[1]['friends'] = [users[3]]
+
+        serialized = FriendsSchema().serialize(users[:2], many=True)
+
+        self.assertEqual([user['id'] for user in serialized['users']], [0, 1])
+        self.assertEqual([user['id'] for user in serialized['linked']['users']], [2, 3])
+        self.assertEqual(serialized['users'][1]['links'], {'friends': [3]})
+
+    def test_nested_dump_returns_resource(self):
+        users = make_users(2)
+        users[0]['friends'] = [users[1]]
+        schema = FriendsSchema()
+        schema._document = CompoundDocument()
+
+        result = schema.dump(users[0]).data
+
+        self.assertIsInstance(result, Resource)
+        self.assertEqual(result.data, {'id': 0, 'name': '0', 'links': {'friends': [1]}})
+        self.assertIsInstance(schema.dump(users[0]).data, Link)
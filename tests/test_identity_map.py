@@ -0,0 +1,74 @@
+import unittest
+
+from serializer.schema import IdentityMap, Linked, Schema
+
+
+class MapUserSchema(Schema):
+    class Meta:
+        primary_key = 'user_id'
+        type = 'users'
+
+        additional = ('name',)
+
+
+class MapEventSchema(Schema):
+    class Meta:
+        primary_key = 'event_id'
+        type = 'events'
+
+        additional = ('name',)
+
+    owner = Linked(MapUserSchema)
+
+
+owner = {'user_id': 1, 'name': 'Pelle'}
+
+events = [
+    {'event_id': i, 'name': 'Event %d' % i, 'owner': owner} for i in range(3)
+]
+
+
+class IdentityMapTest(unittest.TestCase):
+    def test_reused_schema_does_not_leak_state(self):
+        schema = MapEventSchema()
+
+        first = schema.serialize(events, many=True)
+        second = schema.serialize(events, many=True)
+
+        self.assertDictEqual(first, second)
+        self.assertEqual(second['linked'], {'users': [{'id': 1, 'name': 'Pelle'}]})
+
+    def test_shared_resources_are_side_loaded_once(self):
+        identity_map = IdentityMap()
+
+        serialized = MapEventSchema().serialize(events, many=True, identity_map=identity_map)
+
+        self.assertEqual(len(serialized['linked']['users']), 1)
+        self.assertEqual(identity_map.get('users', 1), {'id': 1, 'name': 'Pelle'})
+        self.assertIn(('events', 2), identity_map)
+
+    def test_reused_identity_map_skips_known_resources(self):
+        identity_map = IdentityMap()
+
+        MapEventSchema().serialize(events[0], identity_map=identity_map)
+        serialized = MapEventSchema().serialize(events[1], identity_map=identity_map)
+
+        self.assertEqual(serialized['linked'], {})
+        self.assertEqual(serialized['events']['links'], {'owner': 1})
+
+    def test_dump_many_is_one_serialization(self):
+        dumped = MapEventSchema().dump(events, many=True).data
+
+        self.assertEqual([item['linked'] for item in dumped], [{'users': [{'id': 1, 'name': 'Pelle'}]}, {}, {}])
+
+    def test_nested_schemas_do_not_keep_the_document(self):
+        schema = MapEventSchema()
+        schema.serialize(events, many=True)
+        owner_schema = schema.fields['owner'].schema
+
+        self.assertIsNone(owner_schema._document)
+        self.assertEqual(owner_schema.serialize(owner), {
+            'users': {'id': 1, 'name': 'Pelle'},
+            'linked': {},
+            'links': {}
+        })
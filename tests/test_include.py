@@ -0,0 +1,44 @@
+import unittest
+
+from tests.test_compiler import compiled
+from tests.test_loader import LoadedEventSchema, loaded_events, organizations, users
+from tests.test_many import EventSchema, events
+
+
+class IncludeTest(unittest.TestCase):
+    def test_not_included(self):
+        serialized = EventSchema().serialize(events, many=True, include=[])
+
+        self.assertEqual(serialized['linked'], {})
+        self.assertEqual([event['links'] for event in serialized['events']],
+                         [{'organization': 1}, {'organization': 2}])
+
+    def test_include_path(self):
+        serialized = EventSchema().serialize(events, many=True, include=['organization'])
+
+        self.assertEqual(serialized['linked'], {'organizations': [
+            {'id': 1, 'links': {'owners': []}},
+            {'id': 2, 'links': {'owners': [1, 2]}},
+        ]})
+
+        serialized = EventSchema().serialize(events, many=True, include=['organization.owners'])
+        self.assertEqual(serialized, EventSchema().serialize(events, many=True))
+
+    def test_fieldsets(self):
+        serialized = EventSchema().serialize(events[0], fieldsets={'events': []})
+
+        self.assertEqual(serialized['events'], {'id': 1, 'links': {'organization': 1}})
+
+    def test_compiled(self):
+        for kwargs in [{'include': []}, {'include': ['organization']}, {'fieldsets': {'events': ['name']}}]:
+            self.assertEqual(compiled(EventSchema)().serialize(events, many=True, **kwargs),
+                             EventSchema().serialize(events, many=True, **kwargs))
+
+    def test_not_loaded(self):
+        del users.calls[:]
+        del organizations.calls[:]
+        serialized = LoadedEventSchema().serialize(loaded_events, many=True, include=['organization'])
+
+        self.assertEqual(organizations.calls, [[1, 2]])
+        self.assertEqual(users.calls, [])
+        self.assertEqual(serialized['linked']['organizations'][1]['links'], {'owners': [1, 2]})
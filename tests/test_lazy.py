@@ -0,0 +1,45 @@
+import unittest
+
+from tests.test_document import FriendsSchema, make_users
+from tests.test_loader import LoadedEventSchema, loaded_events, organizations, users
+from tests.test_many import EventSchema, events
+from tests.test_stream import MixedEventSchema, mixed_events
+
+
+class LazyTest(unittest.TestCase):
+    def test_matches_serialize(self):
+        lazy = EventSchema().serialize_lazy(events, many=True)
+
+        self.assertEqual(lazy, EventSchema().serialize(events, many=True))
+        self.assertEqual(lazy.materialize(), EventSchema().serialize(events, many=True))
+
+    def test_mixed_types_in_any_order(self):
+        lazy = MixedEventSchema().serialize_lazy(mixed_events, many=True)
+        primary = [lazy['events'][i] for i in (2, 0, 1)]
+
+        self.assertEqual(primary, [MixedEventSchema().serialize(mixed_events, many=True)['events'][i]
+                                   for i in (2, 0, 1)])
+
+    def test_linked_order(self):
+        friends = make_users(6)
+        friends[1]['friends'] = [friends[2], friends[3]]
+        friends[2]['friends'] = [friends[4]]
+        friends[3]['friends'] = [friends[5], friends[1]]
+
+        lazy = FriendsSchema().serialize_lazy(friends[1])
+
+        self.assertEqual(lazy['users'], FriendsSchema().serialize(friends[1])['users'])
+        self.assertEqual([user['id'] for user in lazy['linked']['users']], [4, 2, 5, 3])
+
+    def test_serializes_on_demand(self):
+        del users.calls[:]
+        del organizations.calls[:]
+        lazy = LoadedEventSchema().serialize_lazy(loaded_events, many=True)
+
+        self.assertEqual(lazy['events'][2], {'id': 3, 'name': 'Bob Dylan', 'links': {'organization': 2}})
+        self.assertEqual(lazy['events'].loaded, 1)
+        self.assertEqual(organizations.calls, [])
+
+        self.assertEqual(sorted(lazy['linked']), ['organizations', 'users'])
+        self.assertEqual((organizations.calls, users.calls), ([[1, 2]], [[1, 2]]))
+        self.assertEqual(lazy['linked']['users'], [{'id': 1}, {'id': 2}])
@@ -0,0 +1,102 @@
+import json
+import unittest
+
+from serializer.schema import Linked, Schema
+from tests.test_compiler import compiled
+from tests.test_many import EventSchema, events
+
+
+class CountingLoader(object):
+    def __init__(self, objects, key, as_list=False):
+        self.objects = dict((obj[key], obj) for obj in objects)
+        self.as_list = as_list
+        self.calls = []
+
+    def __call__(self, keys):
+        self.calls.append(sorted(keys))
+        if self.as_list:
+            return [self.objects.get(key) for key in keys]
+        return dict((key, self.objects[key]) for key in keys if key in self.objects)
+
+
+users = CountingLoader([user for event in events for user in event['organization']['users']],
+                       'user_id', as_list=True)
+organizations = CountingLoader([dict(event['organization'],
+                                     user_ids=[user['user_id'] for user in event['organization']['users']])
+                                for event in events], 'organization_id')
+
+
+class LoadedUserSchema(Schema):
+    class Meta:
+        primary_key = 'user_id'
+        type = 'users'
+
+        additional = ()
+
+
+class LoadedOrganizationSchema(Schema):
+    class Meta:
+        primary_key = 'organization_id'
+        type = 'organizations'
+
+        additional = ()
+
+    owners = Linked(LoadedUserSchema, many=True, attribute='user_ids', loader=users)
+
+
+class LoadedEventSchema(Schema):
+    class Meta:
+        primary_key = 'event_id'
+        type = 'events'
+
+        additional = ('name',)
+
+    organization = Linked(LoadedOrganizationSchema, attribute='organization_id', loader=organizations)
+
+
+loaded_events = [{
+    'event_id': event['event_id'],
+    'name': event['name'],
+    'organization_id': event['organization']['organization_id']
+} for event in events] + [{
+    'event_id': 3,
+    'name': 'Bob Dylan',
+    'organization_id': 2
+}]
+
+
+class LoaderTest(unittest.TestCase):
+    def setUp(self):
+        del users.calls[:]
+        del organizations.calls[:]
+
+    def assertLoadedOnce(self):
+        self.assertEqual(organizations.calls, [[1, 2]])
+        self.assertEqual(users.calls, [[1, 2]])
+
+    def test_one_call_per_relationship(self):
+        serialized = LoadedEventSchema().serialize(loaded_events, many=True)
+        expected = EventSchema().serialize(events, many=True)
+
+        self.assertLoadedOnce()
+        self.assertEqual(serialized['linked'], expected['linked'])
+        self.assertEqual(serialized['events'][:2], expected['events'])
+
+    def test_single_object(self):
+        serialized = LoadedEventSchema().serialize(loaded_events[1])
+
+        self.assertEqual(organizations.calls, [[2]])
+        self.assertEqual(users.calls, [[1, 2]])
+        self.assertEqual(serialized['linked']['users'], [{'id': 1}, {'id': 2}])
+
+    def test_compiled(self):
+        serialized = compiled(LoadedEventSchema)().serialize(loaded_events, many=True)
+
+        self.assertLoadedOnce()
+        self.assertEqual(serialized, LoadedEventSchema().serialize(loaded_events, many=True))
+
+    def test_serialize_iter(self):
+        serialized = json.loads(''.join(LoadedEventSchema().serialize_iter(loaded_events)))
+
+        self.assertLoadedOnce()
+        self.assertEqual(len(serialized['linked']['organizations']), 2)
@@ -0,0 +1,36 @@
+import unittest
+
+from serializer.parallel import merge_documents
+from tests.test_many import EventSchema
+from tests.test_one_to_many import AdminSchema, admin_A
+
+
+def make_events(count):
+    organizations = [{'organization_id': i, 'users': [{'user_id': i % 3}, {'user_id': 7}]} for i in range(4)]
+    return [{'event_id': i, 'name': 'Event %d' % i, 'organization': organizations[i % 4]}
+            for i in range(count)]
+
+
+class ParallelTest(unittest.TestCase):
+    def test_matches_serialize(self):
+        events = make_events(25)
+
+        self.assertDictEqual(EventSchema().serialize_parallel(events, processes=2, chunk_size=4),
+                             EventSchema().serialize(events, many=True))
+
+    def test_single_chunk(self):
+        events = make_events(3)
+
+        self.assertDictEqual(EventSchema().serialize_parallel(iter(events)),
+                             EventSchema().serialize(events, many=True))
+        self.assertDictEqual(EventSchema().serialize_parallel([]),
+                             EventSchema().serialize([], many=True))
+
+    def test_merge_drops_primary_resources_from_linked(self):
+        admin_B = {'admin_id': 2, 'name': 'Nestleder', 'orgs': admin_A['orgs'][:1]}
+        documents = [AdminSchema().serialize([admin], many=True) for admin in (admin_A, admin_B)]
+        documents[1]['linked']['admins'] = [{'id': 1, 'name': admin_A['name']}]
+
+        merged = merge_documents('admins', documents)
+
+        self.assertDictEqual(merged, AdminSchema().serialize([admin_A, admin_B], many=True))
@@ -0,0 +1,83 @@
+import unittest
+
+from serializer.schema import Embedded, Linked, Schema
+
+
+class PlanUserSchema(Schema):
+    class Meta:
+        primary_key = 'user_id'
+        type = 'users'
+
+        additional = ('name',)
+
+    friends = Linked('self', many=True)
+
+
+class PlanOrganizationSchema(Schema):
+    class Meta:
+        primary_key = 'organization_id'
+        type = 'organizations'
+
+        additional = ('name',)
+
+    owner = Linked(PlanUserSchema)
+    members = Embedded(PlanUserSchema, many=True)
+
+
+class PlanEventSchema(Schema):
+    class Meta:
+        primary_key = 'event_id'
+        type = 'events'
+
+        additional = ()
+
+    organizations = Linked(PlanOrganizationSchema, many=True)
+
+
+class PlanTest(unittest.TestCase):
+    def test_plan_is_shared_between_instances(self):
+        self.assertIs(PlanOrganizationSchema().plan, PlanOrganizationSchema().plan)
+
+    def test_plan_partitions_fields(self):
+        plan = PlanOrganizationSchema().plan
+
+        self.assertEqual(plan.type, 'organizations')
+        self.assertEqual(sorted(field.name for field in plan.nested), ['members', 'owner'])
+        self.assertEqual([field.name for field in plan.linked], ['owner'])
+        self.assertEqual([field.name for field in plan.embedded], ['members'])
+        self.assertEqual(plan.linked[0].link_key, 'organizations.owner')
+        self.assertEqual(plan.linked[0].type, 'users')
+        self.assertEqual(plan.get_key({'organization_id': 7}), 7)
+
+    def test_root_links_are_static(self):
+        serialized = PlanEventSchema().serialize([
+            {'event_id': 1, 'organizations': []},
+            {'event_id': 2, 'organizations': [{'organization_id': 1, 'name': 'a',
+                                               'owner': {'user_id': 1, 'name': 'b', 'friends': []},
+                                               'members': []}]}
+        ], many=True)
+
+        self.assertEqual(serialized['links'], {
+            'events.organizations': {'type': 'organizations'},
+            'organizations.owner': {'type': 'users'},
+            'organizations.members': {'type': 'users'},
+            'users.friends': {'type': 'users'},
+            'organizations.members.friends': {'type': 'users'},
+        })
+
+    def test_root_links_of_mutually_linked_schemas(self):
+        names = ['PlanMesh%dSchema' % i for i in range(12)]
+        schema_classes = []
+        for i, name in enumerate(names):
+            class Meta:
+                primary_key = 'id'
+                type = 'mesh%d' % i
+
+            attributes = dict(('to%d' % j, Linked(other)) for j, other in enumerate(names) if j != i)
+            attributes['Meta'] = Meta
+            schema_classes.append(type(name, (Schema,), attributes))
+
+        links = schema_classes[0]().plan.root_links(schema_classes[0]())
+
+        self.assertEqual(len(links), 12 * 11)
+        self.assertEqual(links['mesh3.to5'], {'type': 'mesh5'})
@@ -0,0 +1,43 @@
+import unittest
+
+from serializer.profiling import Profiler
+from tests.test_compiler import compiled
+from tests.test_many import EventSchema, events
+
+
+def stats(report, kind, schema, field=None):
+    return next(entry for entry in report if entry['kind'] == kind and entry['schema'] == schema and
+                entry['field'] == field)
+
+
+class ProfilingTest(unittest.TestCase):
+    def test_report(self):
+        schema = EventSchema()
+        schema.profiler = profiler = Profiler()
+
+        schema.serialize(events, many=True)
+        report = profiler.report()
+
+        events_ = stats(report, 'dump', 'EventSchema')
+        self.assertEqual((events_['count'], events_['objects'], events_['max_depth']), (2, 2, 1))
+        users = stats(report, 'dump', 'UserManySchema')
+        self.assertEqual((users['count'], users['objects'], users['max_depth']), (2, 2, 3))
+        owners = stats(report, 'field', 'OrganizationManySchema', 'owners')
+        self.assertEqual(owners['count'], 2)
+        self.assertGreaterEqual(owners['time'], owners['self_time'])
+        self.assertEqual(stats(report, 'postprocess', 'EventSchema')['count'], 2)
+
+    def test_links_and_callback(self):
+        reports = []
+        schema = compiled(EventSchema)()
+        schema.profiler = profiler = Profiler(callback=reports.append)
+        event = dict(events[1], organization=dict(events[1]['organization']))
+        event['organization']['users'] = [events[1]['organization']['users'][0]] * 2
+
+        schema.serialize(event)
+        schema.serialize(event)
+
+        self.assertEqual(len(reports), 2)
+        users = stats(reports[0], 'dump', 'UserManySchema')
+        self.assertEqual((users['objects'], users['links']), (1, 1))
+        self.assertEqual(stats(profiler.report(), 'dump', 'UserManySchema')['count'], 4)
@@ -0,0 +1,54 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from tests.test_document import FriendsSchema, make_users
+from tests.test_many import EventSchema, events
+
+
+class ReaderTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'events.json')
+        with open(self.path, 'w') as fp:
+            EventSchema().serialize_to(fp, events)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_get_and_resolve(self):
+        document = EventSchema().serialize(events, many=True)
+        with EventSchema().read_document(self.path) as reader:
+            self.assertEqual(len(reader), 2)
+            self.assertEqual(list(reader), document['events'])
+
+            event = reader.get('events', 2)
+            self.assertEqual(event, document['events'][1])
+            organization = reader.resolve('events', event, 'organization')
+            self.assertEqual(organization, {'id': 2, 'links': {'owners': [1, 2]}})
+            self.assertEqual(reader.resolve('organizations', organization, 'owners'), [{'id': 1}, {'id': 2}])
+            self.assertIsNone(reader.get('users', 3))
+
+    def test_saved_index(self):
+        index_path = self.path + '.index'
+        with EventSchema().read_document(self.path, index_path) as reader:
+            index = reader.index
+        self.assertTrue(os.path.exists(index_path))
+
+        with EventSchema().read_document(self.path, index_path) as reader:
+            self.assertEqual(reader.index.resources, index.resources)
+            self.assertEqual(reader.get('organizations', 1), {'id': 1, 'links': {'owners': []}})
+
+    def test_single_cyclic(self):
+        friends = make_users(3)
+        friends[1]['friends'] = [friends[2]]
+        friends[2]['friends'] = [friends[1]]
+        document = FriendsSchema().serialize(friends[1])
+        with open(self.path, 'w') as fp:
+            json.dump(document, fp, indent=2)
+
+        with FriendsSchema().read_document(self.path) as reader:
+            self.assertEqual(list(reader), [document['users']])
+            self.assertEqual(reader.resolve('users', reader.get('users', 2), 'friends'), [document['users']])
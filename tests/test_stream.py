@@ -0,0 +1,66 @@
+import json
+import unittest
+from datetime import datetime
+from StringIO import StringIO
+
+from serializer.schema import IdentityMap, Schema
+from tests.test_many import EventSchema, events
+
+
+class MixedEventSchema(Schema):
+    class Meta:
+        primary_key = 'event_id'
+        type = 'events'
+
+        additional = ('name', 'starts_at')
+
+
+# `additional` fields are formatted by the type of each row's value
+mixed_events = [
+    {'event_id': 1, 'name': 1, 'starts_at': None},
+    {'event_id': 2, 'name': u'Sn\xf8', 'starts_at': datetime(2015, 6, 1, 20)},
+    {'event_id': 3, 'name': 2.5, 'starts_at': None}
+]
+
+
+class StreamTest(unittest.TestCase):
+    def test_serialize_iter_matches_serialize(self):
+        chunks = list(EventSchema().serialize_iter(iter(events)))
+
+        self.assertGreater(len(chunks), len(events))
+        self.assertDictEqual(json.loads(''.join(chunks)),
+                             json.loads(json.dumps(EventSchema().serialize(events, many=True))))
+
+    def test_serialize_iter_mixed_types(self):
+        self.assertDictEqual(json.loads(''.join(MixedEventSchema().serialize_iter(mixed_events))),
+                             json.loads(json.dumps(MixedEventSchema().serialize(mixed_events, many=True))))
+
+    def test_serialize_iter_empty(self):
+        self.assertDictEqual(json.loads(''.join(EventSchema().serialize_iter([]))), {
+            "events": [],
+            "links": {},
+            "linked": {}
+        })
+
+    def test_serialize_to(self):
+        fp = StringIO()
+
+        EventSchema().serialize_to(fp, (event for event in events))
+
+        self.assertEqual([event['id'] for event in json.loads(fp.getvalue())['events']], [1, 2])
+
+    def test_serialize_json(self):
+        for obj, many in [(events, True), (events[1], False)]:
+            self.assertDictEqual(json.loads(EventSchema().serialize_json(obj, many=many)),
+                                 json.loads(json.dumps(EventSchema().serialize(obj, many=many))))
+
+    def test_serialize_json_mixed_types(self):
+        self.assertDictEqual(json.loads(MixedEventSchema().serialize_json(mixed_events, many=True)),
+                             json.loads(json.dumps(MixedEventSchema().serialize(mixed_events, many=True))))
+
+    def test_linked_kept_encoded(self):
+        identity_map = IdentityMap()
+
+        EventSchema().serialize_json(events, many=True, identity_map=identity_map)
+
+        self.assertEqual(identity_map.get('users', 2), '{"id": 2}')